@@ -0,0 +1,305 @@
+import os
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import tempfile
+import contextlib
+
+import openpyxl
+
+from excel_trans import REQUIRED_COLUMNS, SHEET_COUNT_PATTERN, transform_excel_file, load_rule_set
+
+
+# 기본 벤치마크 크기 (행 수) - 1000000행은 기준 결과가 없으므로 --sizes로 지정한 경우에만 실행
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# 기준 결과 파일 (시나리오별 출력 해시와 단계별 소요 시간)
+DEFAULT_BASELINE_FILE = "benchmark_baseline.json"
+
+# 생성한 입력 파일을 보관하는 폴더 (같은 설정이면 다시 생성하지 않음)
+DEFAULT_DATA_DIR = "bench_data"
+
+# 일반 상품 목록 - (기본 상품명, 가능한 장수 목록)
+BASE_PRODUCTS = [
+    ("OPP 봉투 100x150", [100, 200, 500]),
+    ("OPP 봉투 200x300", [100, 300]),
+    ("에어캡 봉투 A4", [50, 100]),
+    ("택배 박스 1호", [10, 20, 50]),
+    ("택배 박스 3호", [10, 30]),
+    ("포장 테이프 투명", [5, 10]),
+    ("스티커 원형 40mm", [500, 1000]),
+    ("리본 끈 레드", []),
+    ("종이 쇼핑백 소", []),
+    ("완충재 롤", []),
+]
+
+
+def generate_order_export(output_file, rows, seed=0, lines_per_customer=3.0, sheet_product_ratio=0.6,
+                          exception_ratio=0.05, limited_product_ratio=0.1, exception_products=(),
+                          extra_sheet=True):
+    """
+    변환 입력과 같은 열 구성의 합성 주문 파일을 생성하는 함수
+    
+    같은 인자와 seed이면 항상 같은 파일이 만들어진다.
+    
+    Args:
+        output_file (str): 생성할 xlsx 파일 경로
+        rows (int): 주문 행 수
+        seed (int): 난수 시드
+        lines_per_customer (float): 같은 고객이 연속으로 나오는 평균 행 수 (고객 반복 비율)
+        sheet_product_ratio (float): "N장" 형식 상품명 비율
+        exception_ratio (float): 예외 상품(정확히 일치) 비율
+        limited_product_ratio (float): 장수 한계가 있는 상품(예외 상품과 기본 상품명이 같은 상품) 비율
+        exception_products (list): 예외 상품명 목록 (exceptions.json)
+        extra_sheet (bool): 두 번째 시트(그대로 복사되는 시트) 추가 여부
+    """
+    rng = random.Random(seed)
+    
+    # 장수 한계가 있는 상품 - 예외 상품명에서 기본 상품명을 가져와 다른 장수로 주문
+    limited_products = []
+    for product in exception_products:
+        match = SHEET_COUNT_PATTERN.search(product)
+        if match:
+            limit = int(match.group(2))
+            base_name = match.group(1).strip()
+            limited_products.extend(f"{base_name} {sheets}장" for sheets in (limit // 5, limit // 3, limit // 2))
+    
+    customer_count = max(1, int(rows / max(lines_per_customer, 1.0)))
+    
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(title="주문목록")
+    sheet.append(REQUIRED_COLUMNS)
+    
+    customer = None
+    for idx in range(rows):
+        # 평균 lines_per_customer 행마다 고객이 바뀜
+        if customer is None or rng.random() < 1.0 / max(lines_per_customer, 1.0):
+            c = rng.randrange(customer_count)
+            customer = (
+                f"고객{c}",
+                f"010-{c // 10000 % 10000:04d}-{c % 10000:04d}",
+                f"{10000 + c % 90000:05d}",
+                f"서울시 테스트구 벤치로 {c}",
+                rng.choice(["", "", "문 앞에 놓아주세요", "부재 시 경비실"])
+            )
+        
+        roll = rng.random()
+        if exception_products and roll < exception_ratio:
+            product = rng.choice(exception_products)
+        elif limited_products and roll < exception_ratio + limited_product_ratio:
+            product = rng.choice(limited_products)
+        else:
+            base_name, sheet_options = rng.choice(BASE_PRODUCTS)
+            if sheet_options and rng.random() < sheet_product_ratio:
+                product = f"{base_name} {rng.choice(sheet_options)}장"
+            else:
+                product = base_name
+        
+        quantity = rng.choice(["1", "1", "1", "2", "3", "5", ""])
+        sheet.append([f"B{seed}-{idx:07d}", "결제완료", product, product, quantity, *customer])
+    
+    if extra_sheet:
+        notes = workbook.create_sheet(title="메모")
+        notes.append(["항목", "값"])
+        notes.append(["생성 행 수", rows])
+        notes.append(["seed", seed])
+    
+    workbook.save(output_file)
+
+
+def output_digest(output_file):
+    """출력 파일 모든 시트의 셀 값으로 만든 SHA-256 해시 (골든 출력 비교용)"""
+    hasher = hashlib.sha256()
+    workbook = openpyxl.load_workbook(output_file, read_only=True, data_only=True)
+    try:
+        for sheet in workbook.worksheets:
+            hasher.update(f"\x1d{sheet.title}".encode('utf-8'))
+            for row in sheet.iter_rows(values_only=True):
+                hasher.update("\x1f".join("" if value is None else str(value) for value in row).encode('utf-8'))
+                hasher.update(b"\x1e")
+    finally:
+        workbook.close()
+    return hasher.hexdigest()
+
+
+def run_scenario(rows, data_dir, exception_file, seed=0, streaming=False, merge_mode="contiguous",
+                 trace_memory=False, **generator_options):
+    """
+    시나리오 하나(입력 생성 -> 변환 -> 출력 해시)를 실행하는 함수
+    
+    trace_memory가 True이면 단계별 최대 메모리도 기록한다 (tracemalloc 때문에 시간이 늘어남).
+    
+    Returns:
+        dict: 시나리오 이름, 출력 해시, 전체/단계별 소요 시간, 처리 건수
+    """
+    rules = load_rule_set(exception_file)
+    
+    # 입력 파일 이름은 생성 설정으로, 시나리오 이름은 생성 설정과 변환 옵션으로 구분
+    options_key = ",".join(f"{k}={v}" for k, v in sorted(generator_options.items()))
+    input_name = f"orders_{rows}_seed{seed}"
+    if options_key:
+        input_name += "_" + hashlib.sha1(options_key.encode('utf-8')).hexdigest()[:8]
+    input_file = os.path.join(data_dir, input_name + ".xlsx")
+    
+    name = f"{rows}rows-seed{seed}-{merge_mode}"
+    if streaming:
+        name += "-streaming"
+    if options_key:
+        name += f"-{options_key}"
+    
+    if not os.path.exists(input_file):
+        print(f"입력 파일 생성 중: {input_file}")
+        generate_order_export(input_file, rows, seed=seed, exception_products=list(rules.exception_products),
+                              **generator_options)
+    
+    with tempfile.TemporaryDirectory() as temp_dir:
+        output_file = os.path.join(temp_dir, "output.xlsx")
+        report_file = os.path.join(temp_dir, "report.json")
+        
+        # 변환 메시지는 벤치마크 출력에서 제외
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+            start_time = time.perf_counter()
+            success = transform_excel_file(input_file, output_file, exception_file, merge_mode=merge_mode,
+                                           streaming=streaming, rules=rules, report_file=report_file,
+                                           trace_memory=trace_memory)
+            total_seconds = time.perf_counter() - start_time
+        
+        if not success:
+            raise RuntimeError(f"변환 실패: {name}")
+        
+        with open(report_file, 'r', encoding='utf-8') as f:
+            report = json.load(f)
+        digest = output_digest(output_file)
+    
+    return {
+        'name': name,
+        'rows': rows,
+        'digest': digest,
+        'total_seconds': round(total_seconds, 6),
+        'stages': {stage['stage']: stage['seconds'] for stage in report['stages']},
+        'peak_memory_bytes': max([stage.get('peak_memory_bytes', 0) for stage in report['stages']] + [0]),
+        'counters': report['counters']
+    }
+
+
+def compare_with_baseline(results, baseline, tolerance, rules_sha1=""):
+    """
+    실행 결과를 기준 결과와 비교하여 출력하는 함수
+    
+    Args:
+        results (list): run_scenario 결과 목록
+        baseline (dict): 기준 결과 파일 내용
+        tolerance (float): 느려짐으로 표시할 시간 증가 비율
+        rules_sha1 (str): 현재 예외 목록 파일 해시
+    
+    Returns:
+        bool: 출력 해시가 모두 기준과 같으면 True (기준이 없는 시나리오는 비교하지 않음)
+    """
+    all_match = True
+    print()
+    print(f"{'시나리오':<40} {'시간(초)':>10} {'기준(초)':>10} {'변화':>8}  출력")
+    for result in results:
+        expected = baseline.get('scenarios', {}).get(result['name'])
+        if expected is None:
+            print(f"{result['name']:<40} {result['total_seconds']:>10.3f} {'-':>10} {'-':>8}  기준 없음")
+            continue
+        
+        ratio = result['total_seconds'] / expected['total_seconds'] if expected['total_seconds'] else 1.0
+        change = f"{(ratio - 1) * 100:+.0f}%"
+        if ratio > 1 + tolerance:
+            change += " 느려짐"
+        
+        if result['digest'] == expected['digest']:
+            output_status = "일치"
+        else:
+            output_status = "불일치!"
+            all_match = False
+        print(f"{result['name']:<40} {result['total_seconds']:>10.3f} {expected['total_seconds']:>10.3f} "
+              f"{change:>8}  {output_status}")
+        
+        for stage, seconds in result['stages'].items():
+            expected_seconds = expected.get('stages', {}).get(stage)
+            if expected_seconds:
+                print(f"    {stage:<34} {seconds:>10.3f} {expected_seconds:>10.3f} "
+                      f"{(seconds / expected_seconds - 1) * 100:>+7.0f}%")
+    
+    if baseline.get('rules_sha1') and baseline['rules_sha1'] != rules_sha1:
+        print("참고: 예외 목록 파일이 기준을 만들 때와 다릅니다. 출력 해시가 달라질 수 있습니다.")
+    return all_match
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="excel_trans 변환 벤치마크 및 골든 출력 회귀 검사")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="벤치마크할 행 수 (기본값: 1000 10000 100000, 예: --sizes 1000000)")
+    parser.add_argument("--seed", type=int, default=0, help="입력 생성 난수 시드 (기본값: 0)")
+    parser.add_argument("--lines-per-customer", type=float, default=3.0, help="고객별 연속 평균 행 수")
+    parser.add_argument("--sheet-product-ratio", type=float, default=0.6, help="N장 형식 상품명 비율")
+    parser.add_argument("--exception-ratio", type=float, default=0.05, help="예외 상품 비율")
+    parser.add_argument("--limited-product-ratio", type=float, default=0.1, help="장수 한계 상품 비율")
+    parser.add_argument("--merge-mode", choices=["contiguous", "global"], default="contiguous")
+    parser.add_argument("--streaming", action="store_true", help="스트리밍 모드로 변환")
+    parser.add_argument("--memory", action="store_true",
+                        help="단계별 최대 메모리도 기록 (tracemalloc으로 시간이 늘어나므로 시간 비교와 따로 실행)")
+    parser.add_argument("--exceptions", default="exceptions.json", help="예외 목록 파일 (기본값: exceptions.json)")
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="생성한 입력 파일 보관 폴더")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE, help="기준 결과 파일")
+    parser.add_argument("--update-baseline", action="store_true", help="이번 결과로 기준 결과 파일 갱신")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="느려짐으로 표시할 시간 증가 비율 (기본값: 0.2)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    os.makedirs(args.data_dir, exist_ok=True)
+    
+    generator_options = {}
+    # 기본값과 다른 생성 옵션만 시나리오 이름에 포함
+    for key, default in (('lines_per_customer', 3.0), ('sheet_product_ratio', 0.6),
+                         ('exception_ratio', 0.05), ('limited_product_ratio', 0.1)):
+        value = getattr(args, key)
+        if value != default:
+            generator_options[key] = value
+    
+    # pandas 등은 변환할 때 처음 로드되므로 미리 로드하여 첫 시나리오 시간에 포함되지 않게 함
+    import pandas  # noqa: F401
+    
+    results = []
+    for rows in args.sizes:
+        print(f"벤치마크 실행 중: {rows}행")
+        results.append(run_scenario(rows, args.data_dir, args.exceptions, seed=args.seed, streaming=args.streaming,
+                                    merge_mode=args.merge_mode, trace_memory=args.memory, **generator_options))
+    
+    rules_sha1 = ""
+    if os.path.exists(args.exceptions):
+        with open(args.exceptions, 'rb') as f:
+            rules_sha1 = hashlib.sha1(f.read()).hexdigest()
+    
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    
+    all_match = compare_with_baseline(results, baseline, args.tolerance, rules_sha1)
+    
+    if args.update_baseline:
+        baseline['rules_sha1'] = rules_sha1
+        scenarios = baseline.setdefault('scenarios', {})
+        for result in results:
+            scenarios[result['name']] = result
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"기준 결과 갱신: {args.baseline}")
+        return 0
+    
+    if not all_match:
+        print("오류: 출력이 기준 결과와 다릅니다. 병합 결과가 바뀌었는지 확인하세요.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,411 +1,1938 @@
-import pandas as pd
-import openpyxl
 import os
-import numpy as np
 import re
 import json
-import traceback
+import hashlib
+import sqlite3
+import sys
+import logging
 import math
+import glob
+import shutil
+import time
+import argparse
+import contextlib
+import concurrent.futures
+import collections
+import itertools
+import functools
+import bisect
+import tracemalloc
+import cProfile
+import csv
+import io
+import uuid
 
+# pandas/numpy/openpyxl은 로드 시간이 길어 실제 변환을 시작할 때 함수 안에서 import 한다
+# (예외 목록 생성, 입력 파일 확인 등은 무거운 라이브러리 없이 바로 실행)
 
-def transform_excel_file(input_file="input.xlsx", output_file="output.xlsx", exception_file="exceptions.json"):
+# 프로그램(모듈) 시작 시각 - 첫 출력까지 걸린 시간 보고용
+_MODULE_LOADED_AT = time.perf_counter()
+
+logger = logging.getLogger("excel_trans")
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """로그 레코드를 한 줄에 하나의 JSON 객체로 변환 (extra={'data': {...}}의 값도 함께 기록)"""
+    
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            'level': record.levelname,
+            'message': record.getMessage()
+        }
+        data = getattr(record, 'data', None)
+        if data is not None:
+            entry['data'] = data
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def configure_logging(level=logging.INFO, jsonl_file=None, stream=None):
+    """
+    변환 메시지 출력 설정
+    
+    기본(INFO)은 조용한 모드로, 행마다 나오던 메시지(예외 상품 처리, 장수 제한 초과)는 출력하지 않고
+    변환이 끝난 뒤 건수만 요약한다. DEBUG로 설정하면 행 단위 메시지도 출력한다.
+    
+    Args:
+        level (int): 출력할 최소 로그 수준 (logging.DEBUG/INFO/WARNING)
+        jsonl_file (str): 지정하면 모든 로그를 JSON Lines 형식으로 이 파일에도 기록
+        stream: 콘솔 대신 메시지를 쓸 스트림 (기본값: sys.stdout)
+    """
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.setLevel(level)
+    logger.propagate = False
+    
+    console_handler = logging.StreamHandler(stream or sys.stdout)
+    console_handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(console_handler)
+    
+    if jsonl_file:
+        jsonl_handler = logging.FileHandler(jsonl_file, encoding='utf-8')
+        jsonl_handler.setFormatter(JsonLinesFormatter())
+        logger.addHandler(jsonl_handler)
+
+
+# 병합 방식
+MERGE_MODE_CONTIGUOUS = "contiguous"  # 연속된 동일 고객 행만 병합 (기존 동작)
+MERGE_MODE_GLOBAL = "global"  # 떨어져 있는 동일 고객 행도 병합
+MERGE_MODES = (MERGE_MODE_CONTIGUOUS, MERGE_MODE_GLOBAL)
+
+
+# 고객 정보 열 (출력 행의 앞 5개 열 순서)
+CUSTOMER_COLUMNS = ['받는분', '받는분 연락처', '배송지 우편번호', '도로명 주소', '배송메시지']
+
+
+class OrderRow:
+    """
+    병합에 필요한 주문 행 정보
+    
+    행마다 dict를 만들지 않도록 __slots__로 속성을 고정한다.
+    customer는 CUSTOMER_COLUMNS 순서의 튜플, customer_key는 병합용 고객 키이다.
+    """
+    __slots__ = ('customer', 'customer_key', 'product', 'base_product', 'sheet_count',
+                 'quantity', 'is_exception', 'order_num')
+    
+    def __init__(self, customer, customer_key, product, base_product, sheet_count,
+                 quantity, is_exception, order_num):
+        self.customer = customer
+        self.customer_key = customer_key
+        self.product = product
+        self.base_product = base_product
+        self.sheet_count = sheet_count
+        self.quantity = quantity
+        self.is_exception = is_exception
+        self.order_num = order_num  # 디버깅용 주문번호
+    
+    def __repr__(self):
+        return f"OrderRow({self.order_num!r}, {self.product!r}, quantity={self.quantity})"
+
+
+def extract_order_rows(required_data, exception_products, errors=None):
+    """
+    필요한 열만 남긴 주문 DataFrame을 OrderRow 목록으로 변환하는 함수
+    
+    상품명 정리, 수량 변환, 예외 상품 판별은 열 단위로 한 번에 처리하고, 장수 패턴은
+    parse_product_name으로 상품명 종류마다 한 번만 추출한다.
+    
+    Args:
+        required_data (DataFrame): 빈 주문번호가 제거된 주문 데이터 (모든 값은 문자열, 입력 시트 순서의 정수 인덱스)
+        exception_products (frozenset): 예외 처리할 상품명 집합 (RuleSet.exceptions)
+        errors (list): 지정하면 건너뛴 행을 {'row', 'order_num', 'error'} dict로 추가 (row는 입력 시트 행 번호)
+    
+    Returns:
+        list: OrderRow 목록 (원본 행 순서 유지)
+    """
+    import pandas as pd
+    
+    product_names = required_data['관리용상품명'].astype(str).str.strip()
+    
+    # 수량 - 숫자가 아니거나 비어 있으면 1
+    quantity_strs = required_data['수량'].astype(str).str.strip()
+    is_digit = quantity_strs.str.isdigit().fillna(False).astype(bool)
+    quantities = pd.to_numeric(quantity_strs.where(is_digit, '1'), errors='coerce')
+    valid = pd.Series(True, index=required_data.index)
+    
+    # 숫자로 판별되었지만 변환되지 않은 값(유니코드 숫자 등)은 개별 처리
+    for idx in quantities.index[quantities.isna()]:
+        try:
+            quantities.at[idx] = int(quantity_strs.at[idx])
+        except Exception as e:
+            logger.warning("행 처리 중 오류: %s", e)
+            valid.at[idx] = False
+            if errors is not None:
+                # 머리글이 1행이므로 인덱스 0이 2행
+                errors.append({'row': int(idx) + 2, 'order_num': required_data.at[idx, '주문번호'],
+                               'error': str(e)})
+    
+    # 예외 상품인지 확인 - 정확히 일치하는 경우
+    is_exception = product_names.isin(exception_products)
+    
+    customer_data = required_data[CUSTOMER_COLUMNS]
+    customer_keys = customer_data[CUSTOMER_COLUMNS[0]].str.cat(
+        [customer_data[col] for col in CUSTOMER_COLUMNS[1:]], sep="_")
+    
+    if not valid.all():
+        customer_data = customer_data[valid]
+        customer_keys = customer_keys[valid]
+        product_names = product_names[valid]
+        quantities = quantities[valid]
+        is_exception = is_exception[valid]
+        order_nums = required_data['주문번호'][valid]
+    else:
+        order_nums = required_data['주문번호']
+    
+    # 장수 패턴 추출 - 상품명 종류별로 한 번만 파싱
+    products = product_names.tolist()
+    parsed_products = {name: parse_product_name(name) for name in set(products)}
+    
+    return [
+        OrderRow(*values) for values in zip(
+            customer_data.itertuples(index=False, name=None),
+            customer_keys.tolist(),
+            products,
+            [parsed_products[name].base_name for name in products],
+            [parsed_products[name].sheet_count for name in products],
+            quantities.astype('int64').tolist(),
+            is_exception.tolist(),
+            order_nums.tolist()
+        )
+    ]
+
+
+def _try_merge_product(slot, row, sheet_limits):
+    """
+    같은 기본 상품명을 가진 상품 슬롯에 행을 병합 시도하는 함수
+    
+    Args:
+        slot (list): [상품명, 수량, 장수] 형태의 병합 상품 정보 (제자리 수정)
+        row (OrderRow): 병합할 주문 행
+        sheet_limits (dict): 기본 상품명별 장수 한계
+    
+    Returns:
+        bool: 병합 성공 여부 (장수 제한 초과 시 False)
+    """
+    product_str, quantity, sheet_count = slot
+    base_product = row.base_product
+    
+    # 상품명이 정확히 일치하는 경우 수량만 더함
+    if product_str == row.product:
+        # 장수 제한 확인
+        if base_product in sheet_limits:
+            limit = sheet_limits[base_product]
+            total_sheets = sheet_count * quantity + row.sheet_count * row.quantity
+            if total_sheets > limit:
+                logger.debug("장수 제한 초과: %s의 장수가 %s장으로 %s장을 초과", base_product, total_sheets, limit)
+                return False
+        
+        slot[1] += row.quantity
+        return True
+    
+    # 기본 상품명이 같은 경우도 병합 - 장수 제한 확인
+    if base_product in sheet_limits:
+        limit = sheet_limits[base_product]
+        current_sheets = sheet_count * quantity if sheet_count > 0 else quantity
+        next_sheets = row.sheet_count * row.quantity if row.sheet_count > 0 else row.quantity
+        total_sheets = current_sheets + next_sheets
+        
+        if total_sheets > limit:
+            logger.debug("장수 제한 초과: %s의 장수가 %s장으로 %s장을 초과", base_product, total_sheets, limit)
+            return False
+    
+    # 장수 형식 처리 (파싱 결과는 캐시에서 가져옴)
+    existing = parse_product_name(product_str)
+    new = parse_product_name(row.product)
+    
+    if existing.has_sheets and new.has_sheets:
+        # 둘 다 장수가 있는 경우 - 장수와 수량 고려하여 합산
+        total_sheets = (existing.sheet_count * quantity) + (new.sheet_count * row.quantity)
+    elif existing.has_sheets:
+        # 기존 상품에만 장수가 있는 경우
+        total_sheets = existing.sheet_count * (quantity + row.quantity)
+    elif new.has_sheets:
+        # 새 상품에만 장수가 있는 경우
+        total_sheets = new.sheet_count * (quantity + row.quantity)
+    else:
+        # 둘 다 장수가 없는 경우는 수량만 합산
+        slot[1] += row.quantity
+        return True
+    
+    slot[0] = f"{base_product} {total_sheets}장"
+    slot[1] = 1  # 이미 장수에 수량 반영됨
+    slot[2] = total_sheets
+    return True
+
+
+def _line_unit_sheets(rows):
+    """
+    기본 병합(_try_merge_product)과 같은 규칙으로 각 행의 수량 1개당 장수를 계산하는 함수
+    
+    장수 형식 상품은 상품명의 장수, 장수 형식이 아닌 상품은 병합될 상품 슬롯의 1개당 장수를 따른다
+    (장수 형식 행보다 앞에 있으면 처음 나오는 장수 형식 행의 장수). 장수 형식 행이 없으면 0이다.
+    따라서 행별 장수(1개당 장수 x 수량, 0이면 수량)의 합은 장수 한계 없이 기본 병합한 결과의 장수와 같다.
+    
+    Args:
+        rows (list): 같은 고객/기본 상품명의 OrderRow 목록 (입력 순서)
+    
+    Returns:
+        list: 행별 1개당 장수 (rows와 같은 순서)
+    """
+    units = [0] * len(rows)
+    first_row = rows[0]
+    slot_product, slot_unit, slot_quantity = first_row.product, first_row.sheet_count, first_row.quantity
+    units[0] = slot_unit
+    plain_rows = [] if slot_unit > 0 else [0]  # 아직 장수가 정해지지 않은 장수 형식이 아닌 행
+    
+    for idx in range(1, len(rows)):
+        row = rows[idx]
+        if row.product == slot_product:
+            # 상품명이 정확히 일치하면 수량만 더함
+            units[idx] = slot_unit
+            slot_quantity += row.quantity
+            if slot_unit == 0:
+                plain_rows.append(idx)
+            continue
+        
+        if slot_unit > 0:
+            # 기존 슬롯에 장수가 있으면 새 행은 자기 장수, 장수가 없으면 슬롯의 1개당 장수
+            units[idx] = row.sheet_count if row.sheet_count > 0 else slot_unit
+        elif row.sheet_count > 0:
+            # 앞의 장수 형식이 아닌 행은 이 행의 장수로 계산
+            units[idx] = row.sheet_count
+            for plain_idx in plain_rows:
+                units[plain_idx] = row.sheet_count
+            plain_rows = []
+        else:
+            # 둘 다 장수가 없으면 수량만 합산
+            plain_rows.append(idx)
+            slot_quantity += row.quantity
+            continue
+        
+        total_sheets = units[idx] * row.quantity + (slot_unit or units[idx]) * slot_quantity
+        slot_product, slot_unit, slot_quantity = f"{row.base_product} {total_sheets}장", total_sheets, 1
+    return units
+
+
+def pack_sheet_lines(rows, limit):
+    """
+    같은 고객/기본 상품명의 주문 행을 장수 한계 이하의 묶음(배송 1건)으로 최소한으로 나누는 함수
+    
+    행별 1개당 장수는 기본 병합과 같은 규칙으로 계산하므로(_line_unit_sheets) 묶음 장수의 합은 나누지 않고
+    병합한 결과의 장수와 같고, 장수 한계 이하인 그룹은 기본 병합과 같은 묶음 하나가 된다.
+    
+    각 행은 수량 단위로만 나누고(한 묶음에 들어가는 최대 수량씩), 큰 항목부터 남은 장수가 가장 적으면서
+    들어가는 묶음에 넣는다 (Best-Fit Decreasing). 한 묶음을 가득 채우는 같은 크기의 항목은 장수 한계의 절반보다
+    커서 항상 새 묶음이 되므로, 개수만큼 한 번에 같은 묶음 여러 개로 만든다. 따라서 처리 시간은 수량과 무관하게
+    행 수에 비례한다. 1개만으로 한계를 넘는 상품은 나눌 수 없으므로 상품명별로 수량을 합쳐 단독 묶음 하나로 둔다.
+    
+    Args:
+        rows (list): 같은 고객/기본 상품명의 OrderRow 목록 (입력 순서)
+        limit (int): 묶음 하나의 장수 한계
+    
+    Returns:
+        list: 묶음별 [상품명, 수량, 장수] 병합 상품 정보 목록
+    """
+    base_product = rows[0].base_product
+    
+    # 1. 수량 단위로 나눈 항목 - (장수, 입력 순서, 상품명, 1개당 장수, 수량, 개수)
+    items = []
+    oversized = {}  # 1개만으로 한계를 넘는 상품 - 상품명 -> [수량, 1개당 장수]
+    for order, (row, unit) in enumerate(zip(rows, _line_unit_sheets(rows))):
+        # 장수 형식이 아닌 행이 다른 행의 장수를 따르면 그 장수의 상품명으로 표시
+        product = row.product if unit == row.sheet_count else f"{base_product} {unit}장"
+        unit_sheets = unit if unit > 0 else 1
+        if row.quantity <= 0:
+            items.append((0, order, product, unit, row.quantity, 1))
+        elif unit_sheets > limit:
+            oversized.setdefault(product, [0, unit])[0] += row.quantity
+        else:
+            units_per_bin = limit // unit_sheets
+            full_bins, remainder = divmod(row.quantity, units_per_bin)
+            if full_bins:
+                items.append((unit_sheets * units_per_bin, order, product, unit, units_per_bin, full_bins))
+            if remainder:
+                items.append((unit_sheets * remainder, order, product, unit, remainder, 1))
+    
+    # 2. 큰 항목부터 남은 장수가 가장 적으면서 들어가는 묶음에 넣음
+    items.sort(key=lambda item: (-item[0], item[1]))
+    bins = []  # 같은 묶음 여러 개 - [장수 합계, {상품명: [수량, 1개당 장수]}, 개수]
+    open_bins = []  # (남은 장수, 묶음 번호) - 남은 장수 순 정렬
+    for size, _, product, unit, units, count in items:
+        while count > 0:
+            pos = bisect.bisect_left(open_bins, (size, -1))
+            if pos == len(open_bins):
+                # 들어갈 묶음이 없으면 개수만큼 같은 묶음을 한 번에 만듦
+                bins.append([size, {product: [units, unit]}, count])
+                bisect.insort(open_bins, (limit - size, len(bins) - 1))
+                break
+            idx = open_bins[pos][1]
+            if bins[idx][2] > 1:
+                # 같은 묶음 여러 개 중 하나에만 넣음 - 하나를 떼어 새 묶음으로 만듦
+                bins[idx][2] -= 1
+                used, products, _ = bins[idx]
+                bins.append([used, {name: list(value) for name, value in products.items()}, 1])
+                idx = len(bins) - 1
+            else:
+                open_bins.pop(pos)
+            used, products, _ = bins[idx]
+            products.setdefault(product, [0, unit])[0] += units
+            bins[idx][0] = used + size
+            bisect.insort(open_bins, (limit - bins[idx][0], idx))
+            count -= 1
+    
+    # 3. 묶음별 병합 상품 정보 - 상품명이 하나면 수량으로, 여러 개면 기존 병합과 같이 "기본 상품명 N장"으로 표시
+    slots = []
+    for used, products, count in bins:
+        if len(products) == 1:
+            (product, (quantity, sheet_count)), = products.items()
+            slot = [product, quantity, sheet_count]
+        else:
+            slot = [f"{base_product} {used}장", 1, used]
+        slots.extend(list(slot) for _ in range(count))
+    for product, (quantity, sheet_count) in oversized.items():
+        slots.append([product, quantity, sheet_count])
+    return slots
+
+
+def _pack_group(group, sheet_limits, counters):
+    """
+    묶음 나누기 대상 행을 모아 둔 병합 그룹을 출력할 그룹 목록으로 펼치는 함수
+    
+    첫 번째 묶음은 원래 그룹의 상품 위치에 넣고, 나머지 묶음은 같은 고객의 새 그룹에 차례로 넣는다.
+    """
+    packing = group.pop('packing', None)
+    if not packing:
+        return [group]
+    
+    groups = [group]
+    for base_product, rows in packing.items():
+        slots = pack_sheet_lines(rows, sheet_limits[base_product])
+        for idx, slot in enumerate(slots):
+            if idx == len(groups):
+                groups.append({'first_row': rows[0], 'customer': group['customer'], 'products': {}})
+                counters['groups'] += 1
+            groups[idx]['products'][base_product] = slot
+        counters['packed_shipments'] += len(slots)
+    return groups
+
+
+def _format_group(group):
+    """병합 그룹의 상품 정보와 수량을 결합하여 최종 출력 행 생성"""
+    final_products = []
+    for prod, qty, sheet_count in group['products'].values():
+        try:
+            if sheet_count > 0 and qty > 1:
+                # 장수 형식이면 장수와 수량을 곱하여 총 장수 계산
+                parsed = parse_product_name(prod)
+                if parsed.has_sheets:
+                    total_sheets = sheet_count * qty
+                    final_products.append(f"{parsed.base_name} {total_sheets}장")
+                else:
+                    final_products.append(f"{prod} {qty}장")
+            elif qty > 1:
+                # 장수 형식이 아니면 수량을 붙여서 표시
+                final_products.append(f"{prod} {qty}장")
+            else:
+                # 수량이 1이면 그대로 사용
+                final_products.append(prod)
+        except Exception as e:
+            logger.warning("상품 형식 처리 중 오류: %s, %s", prod, e)
+            final_products.append(prod)  # 오류 시 원본 사용
+    
+    # 일반 상품 병합하여 한 행으로 추가 - 최종 수량은 항상 1
+    return list(group['customer']) + [" ,".join(final_products), "1"]
+
+
+def _finish_entry(entry):
+    """출력 대기 항목(예외 행 또는 병합 그룹)을 최종 출력 행으로 변환"""
+    if isinstance(entry, list):
+        return entry
+    try:
+        return _format_group(entry)
+    except Exception as e:
+        logger.error("행 병합 중 오류: %s", e, exc_info=True)
+        # 오류 발생 시 원본 행을 그대로 추가
+        first_row = entry['first_row']
+        return list(first_row.customer) + [first_row.product, str(first_row.quantity)]
+
+
+def _flush_pending(pending, sheet_limits, counters, pack_sheets):
+    """출력 대기 항목을 순서대로 출력 행으로 변환 (묶음 나누기 시 그룹 하나가 여러 행이 될 수 있음)"""
+    for entry in pending:
+        if pack_sheets and isinstance(entry, dict):
+            entries = _pack_group(entry, sheet_limits, counters)
+        else:
+            entries = (entry,)
+        for output_entry in entries:
+            counters['output_rows'] += 1
+            yield _finish_entry(output_entry)
+
+
+def iter_merged_rows(rows, sheet_limits, merge_mode=MERGE_MODE_CONTIGUOUS, counters=None, pack_sheets=False):
+    """
+    주문 행을 고객 키와 기본 상품명으로 그룹화하여 병합하고 출력 행을 순서대로 내보내는 제너레이터
+    
+    각 행은 고객 키로 열린 그룹을 찾고, 그룹 안에서는 기본 상품명으로 상품 슬롯을
+    찾으므로 전체 비용은 행 수에 비례한다. 장수 제한으로 병합이 거절되면 같은 고객의
+    다음 그룹을 시도하고, 모두 거절되면 새 그룹을 만든다.
+    
+    연속 모드에서는 고객이 바뀌는 시점에 이전 그룹이 확정되므로 바로 내보내고,
+    전역 모드에서는 모든 행을 읽은 뒤에 내보낸다.
+    
+    pack_sheets가 True이면 장수 한계가 있는 상품은 그룹을 내보낼 때 고객/기본 상품명별로 모아 병합한다.
+    장수는 기본 병합과 같은 규칙으로 계산하며, 병합한 장수가 한계 이하이면 기본 병합과 같게 출력하고
+    한계를 넘으면 행이 하나뿐이어도 한계 이하의 최소 묶음으로 나눈다 (pack_sheet_lines).
+    
+    Args:
+        rows (iterable): OrderRow 목록 또는 제너레이터
+        sheet_limits (dict): 기본 상품명별 장수 한계
+        merge_mode (str): "contiguous"이면 연속된 동일 고객 행만 병합 (기존 동작),
+                          "global"이면 떨어져 있는 동일 고객 행도 병합
+        counters (Counter): 처리 건수를 누적할 카운터 (input_rows, exception_lines, merged_lines,
+                            sheet_limit_rejections, groups, output_rows, packed_lines, packed_shipments)
+        pack_sheets (bool): True이면 장수 한계 초과 시 병합을 거절하는 대신 묶음 나누기로 출력 행 수를 최소화
+    
+    Yields:
+        list: 출력할 행 (7개 열의 리스트)
+    """
+    if merge_mode not in MERGE_MODES:
+        raise ValueError(f"알 수 없는 병합 방식: {merge_mode} (가능한 값: {', '.join(MERGE_MODES)})")
+    
+    if counters is None:
+        counters = collections.Counter()
+    
+    # 기본(조용한) 모드에서는 행마다 메시지 문자열을 만들지 않도록 한 번만 확인
+    debug = logger.isEnabledFor(logging.DEBUG)
+    
+    pending = []  # 출력 순서대로 예외 행(list) 또는 병합 그룹(dict)
+    open_groups = {}  # 고객 키 -> 병합 가능한 그룹 목록
+    last_key = None
+    
+    for row in rows:
+        counters['input_rows'] += 1
+        
+        # 예외 상품인 경우 - 그대로 주문 수량만큼 행 추가 (수량은 항상 1)
+        if row.is_exception:
+            counters['exception_lines'] += 1
+            if debug:
+                logger.debug("예외 상품 처리 중: %s, 수량: %s", row.product, row.quantity)
+            for _ in range(row.quantity):
+                pending.append(list(row.customer) + [row.product, "1"])
+            continue
+        
+        customer_key = row.customer_key
+        
+        # 연속 모드에서는 고객이 바뀌면 이전 그룹은 더이상 병합하지 않으므로 확정된 행을 내보냄
+        if merge_mode == MERGE_MODE_CONTIGUOUS and customer_key != last_key:
+            open_groups.clear()
+            last_key = customer_key
+            yield from _flush_pending(pending, sheet_limits, counters, pack_sheets)
+            pending = []
+        
+        groups = open_groups.setdefault(customer_key, [])
+        
+        # 묶음 나누기 - 장수 한계 상품은 고객의 첫 그룹에 모아 두고 내보낼 때 나눔
+        if pack_sheets and row.base_product in sheet_limits:
+            if not groups:
+                groups.append({'first_row': row, 'customer': row.customer, 'products': {}})
+                pending.append(groups[0])
+                counters['groups'] += 1
+            group = groups[0]
+            group['products'].setdefault(row.base_product, None)  # 상품 순서 유지용 자리
+            group.setdefault('packing', {}).setdefault(row.base_product, []).append(row)
+            counters['packed_lines'] += 1
+            continue
+        
+        rejected = False
+        for group in groups:
+            slot = group['products'].get(row.base_product)
+            if slot is None:
+                # 같은 상품이 없으면 새로 추가
+                group['products'][row.base_product] = [row.product, row.quantity, row.sheet_count]
+                counters['merged_lines'] += 1
+                break
+            try:
+                if _try_merge_product(slot, row, sheet_limits):
+                    counters['merged_lines'] += 1
+                    break
+                rejected = True
+            except Exception as e:
+                logger.error("상품 병합 중 오류: %s", e, exc_info=True)
+        else:
+            # 장수 제한으로 어느 그룹에도 병합하지 못한 행은 한 번만 셈
+            if rejected:
+                counters['sheet_limit_rejections'] += 1
+            # 병합할 그룹이 없으면 이 행으로 새 그룹 시작
+            group = {
+                'first_row': row,
+                'customer': row.customer,
+                'products': {row.base_product: [row.product, row.quantity, row.sheet_count]}
+            }
+            groups.append(group)
+            pending.append(group)
+            counters['groups'] += 1
+    
+    yield from _flush_pending(pending, sheet_limits, counters, pack_sheets)
+
+
+def merge_rows(rows, sheet_limits, merge_mode=MERGE_MODE_CONTIGUOUS, counters=None, pack_sheets=False):
+    """
+    주문 행을 병합하여 출력 행 목록으로 반환하는 함수 (iter_merged_rows 참고)
+    
+    Returns:
+        list: 출력할 행 목록 (각 행은 7개 열의 리스트)
+    """
+    return list(iter_merged_rows(rows, sheet_limits, merge_mode, counters, pack_sheets))
+
+
+# 변환 엔진
+ENGINE_PANDAS = "pandas"  # DataFrame으로 읽어 열 단위로 전처리 (기본값, 큰 파일에 유리)
+ENGINE_OPENPYXL = "openpyxl"  # pandas 없이 openpyxl로 한 행씩 읽고 씀 (작은 파일에서 pandas 로드 비용 없음)
+ENGINE_AUTO = "auto"  # 입력 파일 크기로 선택
+ENGINES = (ENGINE_PANDAS, ENGINE_OPENPYXL, ENGINE_AUTO)
+
+# auto 엔진에서 openpyxl 엔진을 쓰는 최대 입력 파일 크기
+AUTO_ENGINE_MAX_BYTES = 2 * 1024 * 1024
+
+# 입력 파일에 있어야 하는 열
+REQUIRED_COLUMNS = ['주문번호', '상태', '상품명-옵션명', '관리용상품명', '수량',
+                    '받는분', '받는분 연락처', '배송지 우편번호', '도로명 주소', '배송메시지']
+
+# pandas.read_excel이 기본으로 빈 값(NaN)으로 읽는 문자열 - 스트리밍 모드에서도 같은 값을 빈 값으로 처리
+NA_STRINGS = frozenset([
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null'
+])
+
+# 출력 시트 이름
+OUTPUT_SHEET_TITLE = "주문관리목록"
+
+# 출력 행의 열 이름 (XLSX/CSV는 기존과 같이 머리글 없이 기록, Parquet 스키마에만 사용)
+OUTPUT_COLUMNS = CUSTOMER_COLUMNS + ['상품명', '수량']
+
+# 출력 형식 - 지정하지 않으면 출력 파일 확장자로 선택
+OUTPUT_FORMAT_XLSX = "xlsx"
+OUTPUT_FORMAT_CSV = "csv"
+OUTPUT_FORMAT_TSV = "tsv"
+OUTPUT_FORMAT_PARQUET = "parquet"
+OUTPUT_FORMATS = (OUTPUT_FORMAT_XLSX, OUTPUT_FORMAT_CSV, OUTPUT_FORMAT_TSV, OUTPUT_FORMAT_PARQUET)
+OUTPUT_FORMAT_EXTENSIONS = {
+    '.xlsx': OUTPUT_FORMAT_XLSX,
+    '.csv': OUTPUT_FORMAT_CSV,
+    '.tsv': OUTPUT_FORMAT_TSV,
+    '.txt': OUTPUT_FORMAT_TSV,
+    '.parquet': OUTPUT_FORMAT_PARQUET,
+}
+
+# 병합 결과를 출력 형식별 기록기에 한 번에 넘기는 행 수
+WRITE_CHUNK_ROWS = 5000
+
+
+# 상품명 끝의 "N장" 장수 패턴
+SHEET_COUNT_PATTERN = re.compile(r'(.+?)\s+(\d+)장$')
+
+# 상품명 파싱 결과 캐시 크기 (상품 종류는 주문 수보다 훨씬 적으므로 대부분 캐시에서 처리)
+PRODUCT_PARSE_CACHE_SIZE = 8192
+
+# 상품명 파싱 결과 - base_name: 기본 상품명, sheet_count: "N장"의 N (없으면 0),
+# has_sheets: "N장" 형식 여부 ("상품 0장"처럼 장수가 0이어도 True)
+ParsedProduct = collections.namedtuple('ParsedProduct', ['base_name', 'sheet_count', 'has_sheets'])
+
+
+@functools.lru_cache(maxsize=PRODUCT_PARSE_CACHE_SIZE)
+def parse_product_name(product_name):
+    """
+    상품명에서 "N장" 장수 형식을 분리하는 함수 (같은 상품명은 캐시된 결과를 반환)
+    
+    Args:
+        product_name (str): 앞뒤 공백을 제거한 상품명
+    
+    Returns:
+        ParsedProduct: 장수 형식이 아니면 (상품명, 0, False)
+    """
+    match = SHEET_COUNT_PATTERN.search(product_name)
+    if match:
+        return ParsedProduct(match.group(1).strip(), int(match.group(2)), True)
+    return ParsedProduct(product_name, 0, False)
+
+
+class RuleSet:
+    """
+    예외 상품 규칙 (exceptions.json에서 한 번만 만들어 재사용)
+    
+    exceptions는 정확히 일치하는 예외 상품명 frozenset, sheet_limits는 예외 상품명의
+    "N장"에서 추출한 기본 상품명별 장수 한계이다.
+    """
+    
+    def __init__(self, exception_products=()):
+        self.exception_products = tuple(exception_products)  # 원래 순서 (출력용)
+        self.exceptions = frozenset(self.exception_products)
+        self.sheet_limits = {}  # 상품별 장수 한계 저장
+        
+        # 장수 한계 추출 및 저장
+        for product in self.exception_products:
+            try:
+                parsed = parse_product_name(product)
+                if parsed.has_sheets:
+                    self.sheet_limits[parsed.base_name] = parsed.sheet_count
+                    logger.debug("장수 한계 설정: %s - %s장", parsed.base_name, parsed.sheet_count)
+            except Exception as e:
+                logger.warning("장수 한계 추출 오류: %s, %s", product, e)
+    
+    def __len__(self):
+        return len(self.exception_products)
+    
+    @classmethod
+    def from_json(cls, data):
+        """exceptions.json 내용(dict)으로 규칙 생성"""
+        return cls(data.get("exception_products", []))
+
+
+# 예외 파일 절대 경로 -> (파일 서명, 내용 해시, RuleSet) - 파일이 없으면 서명 None, 읽을 수 없으면 내용 해시 None
+_rule_set_cache = {}
+
+
+def load_rule_set(exception_file="exceptions.json"):
+    """
+    예외 목록 파일을 RuleSet으로 로드하는 함수
+    
+    한 번 로드한 규칙은 프로세스 안에서 캐시하며, 파일의 수정 시각/크기가 바뀐 경우에만
+    다시 읽는다. 내용 해시가 같으면 다시 파싱하지 않는다. 파일이 없거나 읽을 수 없는 상태도
+    캐시하므로, 폴더 감시처럼 반복해서 호출해도 경고/오류는 상태가 바뀔 때 한 번만 기록한다.
+    
+    Args:
+        exception_file (str): 예외 목록 JSON 파일 경로
+    
+    Returns:
+        RuleSet: 예외 규칙 (파일이 없거나 읽을 수 없으면 빈 규칙)
+    """
+    cache_key = os.path.abspath(exception_file)
+    cached = _rule_set_cache.get(cache_key)
+    
+    if not os.path.exists(exception_file):
+        # 파일 없음은 서명 None으로 캐시
+        if cached and cached[0] is None:
+            return cached[2]
+        logger.warning("예외 파일 '%s'이 존재하지 않습니다. 예외 없이 계속 진행합니다.", exception_file)
+        rules = RuleSet()
+        _rule_set_cache[cache_key] = (None, None, rules)
+        return rules
+    
+    signature = None
+    try:
+        stat = os.stat(exception_file)
+        signature = (stat.st_mtime_ns, stat.st_size)
+        
+        if cached and cached[0] == signature:
+            return cached[2]
+        
+        with open(exception_file, 'rb') as f:
+            content = f.read()
+        content_hash = hashlib.sha1(content).hexdigest()
+        
+        # 수정 시각만 바뀌고 내용이 같으면 기존 규칙 재사용
+        if cached and cached[1] == content_hash:
+            _rule_set_cache[cache_key] = (signature, content_hash, cached[2])
+            return cached[2]
+        
+        rules = RuleSet.from_json(json.loads(content.decode('utf-8')))
+        logger.info("예외 상품 목록 로드 완료: %s개 항목 (장수 한계 %s개)", len(rules), len(rules.sheet_limits))
+        logger.debug("예외 상품: %s", list(rules.exception_products))
+        
+        _rule_set_cache[cache_key] = (signature, content_hash, rules)
+        return rules
+    except Exception as e:
+        logger.error("예외 목록 로드 중 오류 발생: %s", e)
+        logger.warning("예외 없이 계속 진행합니다.")
+        rules = RuleSet()
+        # 읽을 수 없는 파일은 내용 해시 없이 캐시 - 파일이 바뀌면 다시 읽음
+        if signature is not None:
+            _rule_set_cache[cache_key] = (signature, None, rules)
+        return rules
+
+
+def _cell_text(value):
+    """openpyxl 셀 값을 pandas.read_excel(dtype=str)과 같은 문자열로 변환"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value)
+    return '' if text in NA_STRINGS else text
+
+
+def _build_order_row(order_num, product_value, quantity_value, customer, exception_products):
+    """
+    한 주문 행의 값으로 OrderRow를 생성하는 함수 (extract_order_rows의 행 단위 버전)
+    
+    Args:
+        order_num (str): 주문번호
+        product_value (str): 관리용상품명
+        quantity_value (str): 수량
+        customer (tuple): CUSTOMER_COLUMNS 순서의 고객 정보
+        exception_products (set): 예외 처리할 상품명 집합
+    """
+    product_name = str(product_value).strip()
+    quantity_str = str(quantity_value).strip()
+    quantity = int(quantity_str) if quantity_str and quantity_str.isdigit() else 1
+    
+    # 장수 패턴 추출
+    parsed = parse_product_name(product_name)
+    
+    return OrderRow(customer, "_".join(customer), product_name, parsed.base_name, parsed.sheet_count,
+                    quantity, product_name in exception_products, order_num)
+
+
+def iter_sheet_order_rows(sheet_rows, column_index, exception_products, errors=None):
+    """
+    워크시트 행(값 튜플)을 하나씩 읽어 OrderRow로 변환하는 제너레이터
+    
+    Args:
+        sheet_rows (iterable): 헤더 다음부터의 행 값 튜플
+        column_index (dict): 열 이름 -> 행 튜플 내 위치
+        exception_products (frozenset): 예외 처리할 상품명 집합 (RuleSet.exceptions)
+        errors (list): 지정하면 건너뛴 행을 {'row', 'order_num', 'error'} dict로 추가 (row는 입력 시트 행 번호)
+    
+    Yields:
+        OrderRow: 주문번호가 비어 있지 않은 행
+    """
+    exception_set = frozenset(exception_products)
+    order_col = column_index['주문번호']
+    product_col = column_index['관리용상품명']
+    quantity_col = column_index['수량']
+    customer_cols = [column_index[col] for col in CUSTOMER_COLUMNS]
+    width = max(column_index.values()) + 1
+    
+    for row_number, values in enumerate(sheet_rows, 2):
+        values = [_cell_text(value) for value in values]
+        # 짧은 행은 빈 값으로 채움
+        if len(values) < width:
+            values.extend([''] * (width - len(values)))
+        
+        # 빈 행 제거
+        if values[order_col] == '':
+            continue
+        try:
+            customer = tuple(values[col] for col in customer_cols)
+            yield _build_order_row(values[order_col], values[product_col], values[quantity_col],
+                                   customer, exception_set)
+        except Exception as e:
+            logger.warning("행 처리 중 오류: %s", e)
+            if errors is not None:
+                errors.append({'row': row_number, 'order_num': values[order_col], 'error': str(e)})
+            continue
+
+
+class ConversionProfile:
+    """
+    변환 단계별 소요 시간, 행 수, 최대 메모리와 처리 건수 기록
+    
+    trace_memory가 True이면 tracemalloc으로 단계별 최대 메모리를 함께 기록한다
+    (tracemalloc은 실행 속도를 늦추므로 보고서를 요청한 경우에만 사용).
+    """
+    
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []  # 단계별 기록 (실행 순서)
+        self.counters = collections.Counter()
+        self.errors = []  # 건너뛴 행 - {'row': 입력 시트 행 번호, 'order_num': 주문번호, 'error': 오류 메시지}
+        self.engine = None  # 실제로 사용한 변환 엔진 (auto이면 입력 파일 크기로 선택된 엔진)
+        self.first_output_seconds = None  # 변환 시작부터 첫 출력 행까지 걸린 시간
+        self.startup_to_first_output_seconds = None  # 프로그램 시작부터 첫 출력 행까지 걸린 시간
+        self._start_time = time.perf_counter()
+    
+    def mark_first_output(self):
+        """첫 출력 행을 기록하는 시점 표시 (처음 호출될 때만 기록)"""
+        if self.first_output_seconds is None:
+            now = time.perf_counter()
+            self.first_output_seconds = round(now - self._start_time, 6)
+            self.startup_to_first_output_seconds = round(now - _MODULE_LOADED_AT, 6)
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        with 블록 하나를 단계로 기록
+        
+        블록 안에서 반환된 dict의 'rows'에 처리한 행 수를 넣을 수 있다.
+        """
+        record = {'stage': name, 'seconds': 0.0, 'rows': None}
+        memory_at_start = 0
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            memory_at_start = tracemalloc.get_traced_memory()[0]
+        start_time = time.perf_counter()
+        try:
+            yield record
+        finally:
+            record['seconds'] = round(time.perf_counter() - start_time, 6)
+            if self.trace_memory:
+                peak = tracemalloc.get_traced_memory()[1]
+                record['peak_memory_bytes'] = peak
+                record['peak_memory_increase_bytes'] = peak - memory_at_start
+            self.stages.append(record)
+    
+    def to_dict(self, **info):
+        """보고서 dict 생성 (info는 입력/출력 파일 등 추가 정보)"""
+        report = dict(info)
+        report['total_seconds'] = round(time.perf_counter() - self._start_time, 6)
+        report['first_output_seconds'] = self.first_output_seconds
+        report['startup_to_first_output_seconds'] = self.startup_to_first_output_seconds
+        report['stages'] = self.stages
+        report['counters'] = dict(self.counters)
+        report['errors'] = self.errors
+        return report
+    
+    def log_summary(self):
+        """단계별 소요 시간을 로그로 출력"""
+        logger.info("단계별 소요 시간:")
+        for record in self.stages:
+            rows = f", {record['rows']}행" if record['rows'] is not None else ""
+            memory = ""
+            if 'peak_memory_bytes' in record:
+                memory = f", 최대 메모리 {record['peak_memory_bytes'] / (1024 * 1024):.1f}MB"
+            logger.info("  %s: %.3f초%s%s", record['stage'], record['seconds'], rows, memory)
+        counters = ", ".join(f"{name} {count}" for name, count in sorted(self.counters.items()))
+        logger.info("처리 건수: %s", counters)
+    
+    def write_report(self, report_file, **info):
+        """JSON 보고서 저장"""
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(**info), f, ensure_ascii=False, indent=2)
+
+
+class InputWorkbook:
+    """
+    입력 워크북을 한 번만 열어 주문 시트와 나머지 시트를 제공하는 로더
+    
+    openpyxl read_only 워크북 하나로 pandas DataFrame(일반 모드)과 행 단위 값(스트리밍 모드)을
+    모두 읽고, 추가 시트도 같은 워크북에서 행 단위로 복사한다.
+    """
+    
+    def __init__(self, input_file):
+        import openpyxl
+        
+        self.input_file = input_file
+        # 데이터만 읽기 옵션 (스타일 제외)
+        self.workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+    
+    def close(self):
+        self.workbook.close()
+    
+    def read_order_frame(self):
+        """첫 번째 시트를 모든 값이 문자열인 DataFrame으로 읽음"""
+        import pandas as pd
+        
+        # pd.read_excel에 워크북을 직접 넘기면 읽은 뒤 워크북을 닫으므로 ExcelFile로 감싸서 읽음
+        return pd.ExcelFile(self.workbook, engine="openpyxl").parse(0, dtype=str)
+    
+    def iter_order_sheet_rows(self):
+        """첫 번째 시트의 행 값 튜플을 헤더부터 순서대로 반환"""
+        return self.workbook.worksheets[0].iter_rows(values_only=True)
+    
+    def copy_extra_sheets(self, target_workbook):
+        """
+        첫 번째 시트 이외의 시트를 대상 워크북에 데이터만 행 단위로 복사
+        
+        Args:
+            target_workbook (Workbook): 복사할 대상 워크북 (일반 또는 write_only)
+        """
+        try:
+            # 첫 번째 시트 이외의 다른 시트가 있는 경우에만 복사 시도
+            if len(self.workbook.sheetnames) > 1:
+                logger.info("추가 시트 복사 중...")
+                for source_sheet in self.workbook.worksheets[1:]:
+                    target_sheet = target_workbook.create_sheet(title=source_sheet.title)
+                    
+                    # 데이터만 복사 (스타일 제외)
+                    for row in source_sheet.iter_rows(values_only=True):
+                        target_sheet.append(row)
+        except Exception as e:
+            logger.error("추가 시트 복사 중 오류 발생: %s", e)
+            logger.warning("주요 데이터는 처리되었으며, 추가 시트 복사는 건너뜁니다.")
+
+
+class OrderCheckpoint:
+    """
+    증분 변환용 처리 완료 주문 색인 (SQLite 파일)
+    
+    주문번호별로 주문 내용 지문(고객 정보, 상품명, 수량)과 병합된 고객 키, 결과 파일을 기록한다.
+    다시 실행하면 새 주문과 내용이 바뀐 주문만 골라 변환하고, 결과 파일이 저장된 뒤에
+    commit()으로 기록한다.
+    
+    여러 프로세스(일괄 변환, 폴더 감시 작업자)가 같은 파일을 함께 사용할 수 있도록, 고른 주문은
+    같은 트랜잭션 안에서 변환 중(claimed_orders)으로 등록한다. 다른 프로세스는 변환 중인 주문을
+    건너뛰므로 같은 주문이 두 결과 파일에 들어가지 않는다. 저장에 실패하거나 commit() 없이 닫으면
+    등록을 취소하고, 프로세스가 비정상 종료되어 남은 등록은 CLAIM_TIMEOUT_SECONDS 뒤에 다시 고를 수 있다.
+    """
+    
+    # 변환 중 등록이 이 시간(초)보다 오래되면 비정상 종료된 실행으로 보고 다시 고름
+    CLAIM_TIMEOUT_SECONDS = 6 * 60 * 60
+    
+    def __init__(self, checkpoint_file):
+        self.checkpoint_file = checkpoint_file
+        self.connection = sqlite3.connect(checkpoint_file, timeout=30)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS processed_orders ("
+            " order_num TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " customer_key TEXT NOT NULL,"
+            " output_file TEXT NOT NULL,"
+            " processed_at TEXT NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS claimed_orders ("
+            " order_num TEXT PRIMARY KEY,"
+            " fingerprint TEXT NOT NULL,"
+            " owner TEXT NOT NULL,"
+            " claimed_at REAL NOT NULL)"
+        )
+        self.connection.commit()
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex}"  # 이 실행의 변환 중 등록 표시
+        self._pending = {}  # 주문번호 -> (지문, 고객 키)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+    
+    def close(self):
+        """commit()하지 않은 변환 중 등록을 취소하고 연결을 닫음"""
+        try:
+            self.release()
+        finally:
+            self.connection.close()
+    
+    @staticmethod
+    def _fingerprints(rows):
+        """주문번호별 (지문, 고객 키) 계산 - 같은 주문번호의 모든 행을 순서대로 반영"""
+        hashers = {}
+        customer_keys = {}
+        for row in rows:
+            hasher = hashers.get(row.order_num)
+            if hasher is None:
+                hasher = hashers[row.order_num] = hashlib.sha1()
+                customer_keys[row.order_num] = row.customer_key
+            hasher.update("\x1f".join((row.customer_key, row.product, str(row.quantity))).encode('utf-8'))
+            hasher.update(b"\x1e")
+        return {order_num: (hasher.hexdigest(), customer_keys[order_num]) for order_num, hasher in hashers.items()}
+    
+    def select_new_rows(self, rows):
+        """
+        이전 실행에서 처리하지 않은 주문(새 주문 또는 내용이 바뀐 주문)의 행만 반환
+        
+        다른 프로세스가 같은 내용으로 변환 중인 주문은 건너뛰고, 고른 주문은 읽기와 같은
+        트랜잭션(BEGIN IMMEDIATE)에서 변환 중으로 등록한다.
+        
+        Args:
+            rows (list): 입력 파일의 전체 OrderRow 목록
+        
+        Returns:
+            list: 변환할 OrderRow 목록 (원본 순서 유지)
+        """
+        fingerprints = self._fingerprints(rows)
+        connection = self.connection
+        
+        # 쓰기 잠금을 먼저 잡아 다른 프로세스가 같은 주문을 동시에 고르지 못하게 함
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            processed = dict(connection.execute("SELECT order_num, fingerprint FROM processed_orders"))
+            claimed = dict(connection.execute(
+                "SELECT order_num, fingerprint FROM claimed_orders WHERE claimed_at >= ?",
+                (time.time() - self.CLAIM_TIMEOUT_SECONDS,)
+            ))
+            
+            self._pending = {}
+            changed_count = 0
+            claimed_count = 0
+            for order_num, (fingerprint, customer_key) in fingerprints.items():
+                previous = processed.get(order_num)
+                if previous == fingerprint:
+                    continue
+                if claimed.get(order_num) == fingerprint:
+                    claimed_count += 1
+                    continue
+                if previous is not None:
+                    changed_count += 1
+                self._pending[order_num] = (fingerprint, customer_key)
+            
+            claimed_at = time.time()
+            connection.executemany(
+                "INSERT OR REPLACE INTO claimed_orders (order_num, fingerprint, owner, claimed_at) VALUES (?, ?, ?, ?)",
+                [(order_num, fingerprint, self.owner, claimed_at)
+                 for order_num, (fingerprint, _) in self._pending.items()]
+            )
+            connection.commit()
+        except BaseException:
+            connection.rollback()
+            self._pending = {}
+            raise
+        
+        logger.info("증분 변환: 전체 주문 %s건 중 새 주문 %s건, 변경된 주문 %s건",
+                    len(fingerprints), len(self._pending) - changed_count, changed_count)
+        if claimed_count:
+            logger.info("다른 실행에서 변환 중인 주문 %s건은 건너뜁니다.", claimed_count)
+        return [row for row in rows if row.order_num in self._pending]
+    
+    def commit(self, output_file):
+        """select_new_rows로 고른 주문을 처리 완료로 기록하고 변환 중 등록을 해제 (결과 파일 저장 후 호출)"""
+        processed_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO processed_orders"
+                " (order_num, fingerprint, customer_key, output_file, processed_at) VALUES (?, ?, ?, ?, ?)",
+                [(order_num, fingerprint, customer_key, output_file, processed_at)
+                 for order_num, (fingerprint, customer_key) in self._pending.items()]
+            )
+            self.connection.execute("DELETE FROM claimed_orders WHERE owner = ?", (self.owner,))
+        self._pending = {}
+    
+    def release(self):
+        """select_new_rows로 고른 주문의 변환 중 등록을 취소 (결과 파일 저장 실패 시 다음 실행에서 다시 변환)"""
+        with self.connection:
+            self.connection.execute("DELETE FROM claimed_orders WHERE owner = ?", (self.owner,))
+        self._pending = {}
+
+
+def _output_name(output_file):
+    """로그에 표시할 출력 대상 이름 (파일 객체는 이름이 없으면 메모리 출력으로 표시)"""
+    if isinstance(output_file, (str, os.PathLike)):
+        return str(output_file)
+    return getattr(output_file, 'name', None) or "<메모리>"
+
+
+class XlsxOutputWriter:
+    """
+    병합 결과를 write_only 워크북에 기록하는 XLSX 기록기 (기본 출력 형식)
+    
+    전화번호(B열)는 문자열 서식('@')으로 기록하고, 저장 시 입력 워크북의 추가 시트도 복사한다.
+    """
+    
+    def __init__(self, output_file):
+        import openpyxl
+        
+        self.output_file = output_file
+        self.workbook = openpyxl.Workbook(write_only=True)
+        self.sheet = self.workbook.create_sheet(title=OUTPUT_SHEET_TITLE)
+    
+    def write_rows(self, rows):
+        """출력 행 묶음을 시트에 추가"""
+        from openpyxl.cell import WriteOnlyCell
+        
+        sheet = self.sheet
+        for row_data in rows:
+            # 전화번호(B열)는 문자열 서식 적용
+            phone_cell = WriteOnlyCell(sheet, value=row_data[1])
+            phone_cell.number_format = '@'
+            sheet.append([row_data[0], phone_cell] + row_data[2:])
+    
+    def copy_extra_sheets(self, input_workbook):
+        """원본 워크북의 다른 시트 복사"""
+        input_workbook.copy_extra_sheets(self.workbook)
+    
+    def close(self, row_count):
+        """결과 파일을 저장하고 성공 여부를 반환"""
+        try:
+            self.workbook.save(self.output_file)
+            logger.info("파일 변환 완료: %s (%s행)", _output_name(self.output_file), row_count)
+            return True
+        except Exception as e:
+            logger.error("파일 저장 중 오류 발생: %s", e)
+            return False
+    
+    def discard(self):
+        """저장하지 않고 버림 (write_only 워크북은 저장 전까지 파일을 만들지 않음)"""
+        self.workbook = None
+
+
+class DelimitedOutputWriter:
+    """
+    병합 결과를 CSV/TSV로 바로 기록하는 기록기
+    
+    모든 값은 입력에서 읽은 문자열 그대로 따옴표로 감싸 기록하므로, 파일을 문자열로 읽는 프로그램
+    (택배 업로드, 분석용 적재 등)에서는 전화번호의 앞자리 0이 그대로 유지된다. Excel은 따옴표와 관계없이
+    값을 숫자로 해석하므로 Excel에서 열면 앞자리 0이 사라진다 (Excel용으로는 xlsx 출력 사용).
+    Excel에서 한글이 깨지지 않도록 BOM이 있는 UTF-8로 저장한다.
+    output_file이 바이너리 파일 객체(io.BytesIO 등)이면 그 객체에 기록하고 닫지 않는다.
+    """
+    
+    def __init__(self, output_file, delimiter=","):
+        self.output_file = output_file
+        self._owns_file = isinstance(output_file, (str, os.PathLike))
+        if self._owns_file:
+            self.file = open(output_file, 'w', encoding='utf-8-sig', newline='')
+        else:
+            self.file = io.TextIOWrapper(output_file, encoding='utf-8-sig', newline='')
+        self.writer = csv.writer(self.file, delimiter=delimiter, quoting=csv.QUOTE_ALL)
+    
+    def write_rows(self, rows):
+        """출력 행 묶음을 한 번에 기록"""
+        self.writer.writerows(rows)
+    
+    def copy_extra_sheets(self, input_workbook):
+        """시트가 없는 형식이므로 추가 시트는 복사하지 않음"""
+        logger.debug("추가 시트는 %s 출력에 복사하지 않습니다.", self.output_file)
+    
+    def close(self, row_count):
+        """파일을 닫고 성공 여부를 반환"""
+        try:
+            self._release()
+            logger.info("파일 변환 완료: %s (%s행)", _output_name(self.output_file), row_count)
+            return True
+        except Exception as e:
+            logger.error("파일 저장 중 오류 발생: %s", e)
+            return False
+    
+    def discard(self):
+        """기록 중인 파일을 닫고 삭제"""
+        self._release()
+        if self._owns_file:
+            with contextlib.suppress(OSError):
+                os.remove(self.output_file)
+    
+    def _release(self):
+        """직접 연 파일은 닫고, 전달받은 파일 객체는 닫지 않고 분리"""
+        if self._owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+            self.file.detach()
+
+
+class ParquetOutputWriter:
+    """
+    병합 결과를 Parquet으로 기록하는 기록기 (pyarrow가 설치된 경우에만 사용 가능)
+    
+    모든 열은 문자열(string) 형식이며, 전달받은 행 묶음마다 하나의 row group으로 기록한다.
+    """
+    
+    def __init__(self, output_file):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise RuntimeError("Parquet 출력에는 pyarrow가 필요합니다 (pip install pyarrow)") from None
+        
+        self.output_file = output_file
+        self._pa = pa
+        self.schema = pa.schema([(name, pa.string()) for name in OUTPUT_COLUMNS])
+        self.writer = pq.ParquetWriter(output_file, self.schema)
+    
+    def write_rows(self, rows):
+        """출력 행 묶음을 열 단위로 바꿔 한 번에 기록"""
+        if not rows:
+            return
+        pa = self._pa
+        columns = [pa.array(values, type=pa.string()) for values in zip(*rows)]
+        self.writer.write_table(pa.Table.from_arrays(columns, schema=self.schema))
+    
+    def copy_extra_sheets(self, input_workbook):
+        """시트가 없는 형식이므로 추가 시트는 복사하지 않음"""
+        logger.debug("추가 시트는 %s 출력에 복사하지 않습니다.", self.output_file)
+    
+    def close(self, row_count):
+        """파일을 닫고 성공 여부를 반환"""
+        try:
+            self.writer.close()
+            logger.info("파일 변환 완료: %s (%s행)", _output_name(self.output_file), row_count)
+            return True
+        except Exception as e:
+            logger.error("파일 저장 중 오류 발생: %s", e)
+            return False
+    
+    def discard(self):
+        """기록 중인 파일을 닫고 삭제"""
+        with contextlib.suppress(Exception):
+            self.writer.close()
+        if isinstance(self.output_file, (str, os.PathLike)):
+            with contextlib.suppress(OSError):
+                os.remove(self.output_file)
+
+
+def resolve_output_format(output_file, output_format=None):
+    """
+    출력 형식 결정 - output_format을 지정하지 않으면 출력 파일 확장자로 선택
+    
+    output_format을 지정했는데 출력 파일 확장자가 다른 형식이면(예: output.xlsx에 csv) 잘못된 형식의
+    파일을 만들지 않도록 오류로 처리한다.
+    
+    Args:
+        output_file (str): 출력 파일 경로
+        output_format (str): "xlsx", "csv", "tsv", "parquet" 중 하나 (None이면 확장자 사용)
+    
+    Returns:
+        str: 출력 형식
+    """
+    extension = os.path.splitext(str(output_file))[1].lower()
+    extension_format = OUTPUT_FORMAT_EXTENSIONS.get(extension)
+    if output_format is None:
+        output_format = extension_format
+        if output_format is None:
+            raise ValueError(f"출력 형식을 알 수 없는 확장자입니다: {output_file} "
+                             f"(가능한 확장자: {', '.join(OUTPUT_FORMAT_EXTENSIONS)})")
+    elif output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"알 수 없는 출력 형식: {output_format} (가능한 값: {', '.join(OUTPUT_FORMATS)})")
+    elif extension_format is not None and extension_format != output_format:
+        raise ValueError(f"출력 형식 {output_format}이 출력 파일 확장자와 다릅니다: {output_file}")
+    return output_format
+
+
+def create_output_writer(output_file, output_format=None):
+    """출력 형식에 맞는 기록기 생성"""
+    output_format = resolve_output_format(output_file, output_format)
+    if output_format == OUTPUT_FORMAT_CSV:
+        return DelimitedOutputWriter(output_file, ",")
+    if output_format == OUTPUT_FORMAT_TSV:
+        return DelimitedOutputWriter(output_file, "\t")
+    if output_format == OUTPUT_FORMAT_PARQUET:
+        return ParquetOutputWriter(output_file)
+    return XlsxOutputWriter(output_file)
+
+
+def _output_files(output_file):
+    """output_file 인자(경로 하나 또는 경로 목록)를 경로 목록으로 변환"""
+    if isinstance(output_file, (list, tuple)):
+        return [str(path) for path in output_file]
+    return [str(output_file)]
+
+
+@contextlib.contextmanager
+def _open_output_writers(output_files, output_format=None):
+    """출력 파일별 기록기를 열고, 저장하지 못한 채 끝나면 만들던 파일을 정리"""
+    writers = []
+    try:
+        for path in output_files:
+            writers.append(create_output_writer(path, output_format))
+        yield writers
+    except BaseException:
+        for writer in writers:
+            writer.discard()
+        raise
+
+
+def _write_merged_rows(writers, merged_rows, profile):
+    """
+    병합 결과를 WRITE_CHUNK_ROWS행씩 묶어 모든 기록기에 한 번에 전달 (병합은 한 번만 수행)
+    
+    Returns:
+        int: 기록한 행 수
+    """
+    row_count = 0
+    merged_rows = iter(merged_rows)
+    while True:
+        chunk = list(itertools.islice(merged_rows, WRITE_CHUNK_ROWS))
+        if not chunk:
+            return row_count
+        if row_count == 0:
+            profile.mark_first_output()
+        for writer in writers:
+            writer.write_rows(chunk)
+        row_count += len(chunk)
+
+
+def _finish_output_writers(writers, input_workbook, profile, row_count):
+    """추가 시트를 복사하고 모든 출력 파일을 저장 - 데이터가 없으면 파일을 만들지 않음"""
+    # 데이터가 없는 경우 처리
+    if row_count == 0:
+        logger.warning("변환할 데이터가 없습니다.")
+        for writer in writers:
+            writer.discard()
+        return False
+    
+    # 원본 워크북의 다른 시트 복사 (같은 입력 워크북 재사용, 여러 입력을 합친 경우에는 복사하지 않음)
+    if input_workbook is not None:
+        with profile.stage("copy_extra_sheets"):
+            for writer in writers:
+                writer.copy_extra_sheets(input_workbook)
+    
+    # 결과 파일 저장
+    with profile.stage("save"):
+        results = [writer.close(row_count) for writer in writers]
+    return all(results)
+
+
+def _sheet_column_index(header):
+    """헤더 행 값에서 필요한 열 이름 -> 열 위치 dict 생성 (없는 열은 포함하지 않음)"""
+    # 중복된 열 이름은 pandas와 같이 첫 번째 열 사용
+    column_index = {}
+    for idx, name in enumerate(header):
+        if name is not None:
+            column_index.setdefault(str(name), idx)
+    return {col: column_index[col] for col in REQUIRED_COLUMNS if col in column_index}
+
+
+def _extract_frame_rows(df, exception_products, errors=None):
+    """read_order_frame으로 읽은 DataFrame을 OrderRow 목록으로 변환 (필요한 열이 있는지는 호출 전에 확인)"""
+    import numpy as np
+    
+    # NaN 값 처리
+    df = df.replace({np.nan: ''})
+    
+    # 1. 데이터 전처리 - 필요한 열만 선택
+    required_data = df[REQUIRED_COLUMNS].copy()
+    
+    # 빈 행 제거
+    required_data = required_data[required_data['주문번호'] != '']
+    
+    # 2. 주문 데이터를 OrderRow 목록으로 변환 (열 단위 일괄 처리)
+    return extract_order_rows(required_data, exception_products, errors)
+
+
+def _missing_columns_error(missing_columns, profile):
+    """필요한 열이 없는 입력 파일 오류 기록"""
+    logger.error("오류: 필요한 열이 없습니다: %s", ', '.join(missing_columns))
+    profile.errors.append({'row': None, 'order_num': None,
+                           'error': f"필요한 열이 없습니다: {', '.join(missing_columns)}"})
+
+
+def _transform_excel_file_streaming(input_workbook, output_files, rules, merge_mode, profile, output_format=None,
+                                    pack_sheets=False):
     """
-    1번 Excel 파일을 2번 파일과 같은 형식으로 변환하는 함수
-    예외 상품은 장수와 무관하게 기본 상품명으로 비교하여 처리
+    입력을 read_only로 한 행씩 읽고, 병합 결과를 출력 기록기에 바로 넘기는 변환 함수
+    
+    pandas를 사용하지 않으므로 openpyxl 엔진으로도 사용한다. 연속 병합 모드에서는 메모리 사용량이 전체 행 수와 무관하게 일정하다.
+    (전역 병합 모드는 모든 행을 읽은 뒤에 출력하므로 병합 결과만큼 메모리를 사용)
     """
-    try:
-        print(f"파일 로딩 중: {input_file}")
+    sheet_rows = input_workbook.iter_order_sheet_rows()
+    column_index = _sheet_column_index(next(sheet_rows, None) or ())
+    
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in column_index]
+    if missing_columns:
+        _missing_columns_error(missing_columns, profile)
+        return False
+    
+    with _open_output_writers(output_files, output_format) as writers:
+        # 파싱 -> 병합 -> 기록 파이프라인 (단계가 행 단위로 맞물려 있어 한 단계로 기록)
+        with profile.stage("stream_parse_merge_write") as stage:
+            rows = iter_sheet_order_rows(sheet_rows, column_index, rules.exceptions, profile.errors)
+            merged_rows = iter_merged_rows(rows, rules.sheet_limits, merge_mode, profile.counters, pack_sheets)
+            row_count = _write_merged_rows(writers, merged_rows, profile)
+            stage['rows'] = row_count
         
-        # 먼저 pandas로 데이터 로드
-        df = pd.read_excel(input_file, sheet_name=0, dtype=str)
+        return _finish_output_writers(writers, input_workbook, profile, row_count)
+
+
+def _transform_excel_file_dataframe(input_workbook, output_files, rules, merge_mode, profile, checkpoint=None,
+                                    output_format=None, pack_sheets=False):
+    """
+    입력 첫 번째 시트를 DataFrame으로 읽어 열 단위로 전처리한 뒤 병합하는 변환 함수
+    
+    checkpoint(OrderCheckpoint)가 있으면 이전에 처리하지 않은 주문만 변환하며, 새 주문이 없으면
+    파일을 만들지 않고 None을 반환한다.
+    """
+    with profile.stage("read_excel") as stage:
+        df = input_workbook.read_order_frame()
+        stage['rows'] = len(df)
+    
+    missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_columns:
+        _missing_columns_error(missing_columns, profile)
+        return False
+    
+    with profile.stage("extract_rows") as stage:
+        rows = _extract_frame_rows(df, rules.exceptions, profile.errors)
+        stage['rows'] = len(rows)
+    
+    # 증분 모드 - 새 주문/변경된 주문만 변환
+    if checkpoint is not None:
+        with profile.stage("checkpoint_filter") as stage:
+            rows = checkpoint.select_new_rows(rows)
+            stage['rows'] = len(rows)
+        if not rows:
+            logger.warning("새로 변환할 주문이 없습니다. 결과 파일을 만들지 않습니다.")
+            return None
+    
+    # 3. 고객 키/기본 상품명으로 그룹화하여 병합
+    with profile.stage("merge") as stage:
+        merged_rows = merge_rows(rows, rules.sheet_limits, merge_mode, profile.counters, pack_sheets)
+        stage['rows'] = len(merged_rows)
+    
+    # 데이터가 없는 경우 처리
+    if not merged_rows:
+        logger.warning("변환할 데이터가 없습니다.")
+        return False
+    
+    with _open_output_writers(output_files, output_format) as writers:
+        # 출력 형식별로 행 묶음 단위 기록 (셀 단위로 기록하지 않음)
+        with profile.stage("write_rows") as stage:
+            stage['rows'] = _write_merged_rows(writers, merged_rows, profile)
         
-        # 예외 목록 로드
-        exception_products = []
-        sheet_limits = {}  # 상품별 장수 한계 저장
+        # 결과 파일 저장 - 모든 출력 파일 저장에 성공한 경우에만 처리 완료로 기록
+        if not _finish_output_writers(writers, input_workbook, profile, len(merged_rows)):
+            return False
+    if checkpoint is not None:
+        checkpoint.commit(", ".join(output_files))
+    return True
+
+
+def _log_counters(counters):
+    """행마다 출력하지 않고 모아 둔 처리 건수를 한 번에 출력"""
+    if not counters:
+        return
+    logger.info("병합 결과: 입력 %s행 -> 출력 %s행 (병합 %s건, 예외 상품 %s건, 장수 제한으로 병합하지 않음 %s건)",
+                counters['input_rows'], counters['output_rows'], counters['merged_lines'],
+                counters['exception_lines'], counters['sheet_limit_rejections'],
+                extra={'data': dict(counters)})
+    if counters['packed_lines']:
+        logger.info("장수 한계 묶음 나누기: %s행 -> %s묶음", counters['packed_lines'], counters['packed_shipments'])
+
+
+def _input_size(input_file):
+    """입력 파일 크기 (메모리 입력은 io.BytesIO)"""
+    if isinstance(input_file, io.BytesIO):
+        return input_file.getbuffer().nbytes
+    return os.path.getsize(input_file)
+
+
+def _resolve_engine(engine, input_file, streaming, checkpoint_file):
+    """실제로 사용할 변환 엔진 결정 (스트리밍 모드는 항상 openpyxl 엔진)"""
+    if engine not in ENGINES:
+        raise ValueError(f"알 수 없는 변환 엔진: {engine} (가능한 값: {', '.join(ENGINES)})")
+    if streaming:
+        return ENGINE_OPENPYXL
+    if engine == ENGINE_AUTO:
+        # 증분 변환은 pandas 엔진에서만 지원
+        if checkpoint_file or _input_size(input_file) > AUTO_ENGINE_MAX_BYTES:
+            return ENGINE_PANDAS
+        return ENGINE_OPENPYXL
+    return engine
+
+
+def _run_transform(input_file, output_file, exception_file, merge_mode, streaming, rules, checkpoint_file, profile,
+                   engine=ENGINE_PANDAS, output_format=None, pack_sheets=False):
+    """transform_excel_file의 실제 변환 처리 (인자 설명은 transform_excel_file 참고)"""
+    try:
+        logger.info("파일 로딩 중: %s", input_file)
         
-        if os.path.exists(exception_file):
+        # 출력 파일 확인 - 형식을 알 수 없으면 입력을 읽기 전에 중단
+        output_files = _output_files(output_file)
+        for path in output_files:
             try:
-                with open(exception_file, 'r', encoding='utf-8') as f:
-                    exception_data = json.load(f)
-                    if "exception_products" in exception_data:
-                        exception_products = exception_data["exception_products"]
-                        
-                        # 장수 한계 추출 및 저장
-                        for product in exception_products:
-                            try:
-                                match = re.search(r'(.+?)\s+(\d+)장$', product)
-                                if match:
-                                    base_name = match.group(1).strip()
-                                    sheet_limit = int(match.group(2))
-                                    sheet_limits[base_name] = sheet_limit
-                                    print(f"장수 한계 설정: {base_name} - {sheet_limit}장")
-                            except Exception as e:
-                                print(f"장수 한계 추출 오류: {product}, {str(e)}")
-                        
-                print(f"예외 상품 목록 로드 완료: {len(exception_products)}개 항목")
-                print(f"예외 상품: {exception_products}")
-            except Exception as e:
-                print(f"예외 목록 로드 중 오류 발생: {str(e)}")
-                print("예외 없이 계속 진행합니다.")
-        else:
-            print(f"예외 파일 '{exception_file}'이 존재하지 않습니다. 예외 없이 계속 진행합니다.")
+                resolve_output_format(path, output_format)
+            except ValueError as e:
+                logger.error("오류: %s", e)
+                return False
         
-        required_columns = ['주문번호', '상태', '상품명-옵션명', '관리용상품명', '수량', 
-                           '받는분', '받는분 연락처', '배송지 우편번호', '도로명 주소', '배송메시지']
+        # 예외 목록 로드 (캐시된 규칙 재사용)
+        if rules is None:
+            with profile.stage("load_rules"):
+                rules = load_rule_set(exception_file)
         
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        if missing_columns:
-            print(f"오류: 필요한 열이 없습니다: {', '.join(missing_columns)}")
+        engine = profile.engine = _resolve_engine(engine, input_file, streaming, checkpoint_file)
+        if checkpoint_file and engine == ENGINE_OPENPYXL:
+            logger.error("오류: 증분 변환은 스트리밍 모드/openpyxl 엔진과 함께 사용할 수 없습니다.")
             return False
         
-        # NaN 값 처리
-        df = df.replace({np.nan: ''})
+        # 입력 파일은 한 번만 열어 주문 시트와 추가 시트에 함께 사용
+        with profile.stage("open_input"):
+            input_workbook = InputWorkbook(input_file)
+        with input_workbook:
+            # pandas 없이 openpyxl만으로 행 단위 변환 (스트리밍 모드 포함)
+            if engine == ENGINE_OPENPYXL:
+                return _transform_excel_file_streaming(input_workbook, output_files, rules, merge_mode, profile,
+                                                       output_format, pack_sheets)
+            if checkpoint_file:
+                # 이전 실행의 결과 파일은 아직 올리지 않았을 수 있으므로 덮어쓰지 않고 새 파일에 저장
+                output_files = [_unique_path(path) for path in output_files]
+                with OrderCheckpoint(checkpoint_file) as checkpoint:
+                    return _transform_excel_file_dataframe(input_workbook, output_files, rules, merge_mode,
+                                                           profile, checkpoint, output_format, pack_sheets)
+            return _transform_excel_file_dataframe(input_workbook, output_files, rules, merge_mode, profile,
+                                                   output_format=output_format, pack_sheets=pack_sheets)
+            
+    except Exception as e:
+        logger.error("파일 변환 중 오류 발생: %s", e, exc_info=True)
+        return False
+
+
+def transform_excel_file(input_file="input.xlsx", output_file="output.xlsx", exception_file="exceptions.json",
+                         merge_mode=MERGE_MODE_CONTIGUOUS, streaming=False, rules=None, checkpoint_file=None,
+                         report_file=None, cprofile_file=None, trace_memory=True, engine=ENGINE_PANDAS,
+                         output_format=None, pack_sheets=False):
+    """
+    1번 Excel 파일을 2번 파일과 같은 형식으로 변환하는 함수
+    예외 상품은 장수와 무관하게 기본 상품명으로 비교하여 처리
+    
+    Args:
+        output_file (str | list): 출력 파일 경로 또는 경로 목록. 목록이면 한 번 병합한 결과를
+                                  파일마다 기록 (예: ["output.xlsx", "output.csv"])
+        merge_mode (str): "contiguous"(기본값, 연속된 동일 고객 행만 병합) 또는
+                          "global"(떨어져 있는 동일 고객 행도 병합)
+        streaming (bool): True이면 입력을 한 행씩 읽고 결과를 바로 기록하는 스트리밍 모드로 변환
+                          (대용량 파일에서 메모리 사용량을 일정하게 유지)
+        rules (RuleSet): 미리 로드한 예외 규칙 (지정하면 exception_file을 읽지 않음)
+        checkpoint_file (str): 증분 변환용 SQLite 파일. 지정하면 이전 실행에서 처리한 주문번호를
+                               건너뛰고 새 주문/변경된 주문만 output_file에 기록 (스트리밍 모드와 함께 사용 불가).
+                               output_file이 이미 있으면 덮어쓰지 않고 이름 뒤에 시각을 붙인 새 파일에 기록
+        report_file (str): 단계별 소요 시간/행 수/최대 메모리(tracemalloc)와 처리 건수를 기록할 JSON 파일
+        cprofile_file (str): cProfile 결과를 저장할 파일 (pstats로 분석)
+        trace_memory (bool): report_file 기록 시 tracemalloc으로 최대 메모리도 기록할지 여부
+                             (tracemalloc은 변환 속도를 크게 늦추므로 시간만 측정할 때는 False)
+        engine (str): "pandas"(기본값), "openpyxl"(pandas 없이 행 단위로 변환, 작은 파일용) 또는
+                      "auto"(입력 파일이 작으면 openpyxl 엔진 사용). 스트리밍 모드는 항상 openpyxl 엔진
+        output_format (str): "xlsx", "csv", "tsv", "parquet"(pyarrow 필요) 중 하나. 지정하지 않으면
+                             출력 파일 확장자(.xlsx/.csv/.tsv/.txt/.parquet)로 선택. CSV/TSV/Parquet에는
+                             추가 시트를 복사하지 않음
+        pack_sheets (bool): True이면 장수 한계를 넘는 행을 따로 출력하는 대신, 같은 고객/기본 상품명의 행을
+                            장수 한계 이하의 최소 묶음으로 나누어 출력 행(송장) 수를 줄임
+    
+    Returns:
+        bool: 변환 성공 여부. 증분 변환에서 새 주문이 없으면 None (결과 파일을 만들지 않고,
+              같은 경로에 남아 있던 이전 결과 파일도 그대로 둠)
+    """
+    trace_memory = bool(report_file) and trace_memory
+    profile = ConversionProfile(trace_memory=trace_memory)
+    
+    started_tracing = False
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        started_tracing = True
+    profiler = cProfile.Profile() if cprofile_file else None
+    if profiler is not None:
+        profiler.enable()
+    
+    success = False
+    try:
+        success = _run_transform(input_file, output_file, exception_file, merge_mode, streaming, rules,
+                                 checkpoint_file, profile, engine, output_format, pack_sheets)
+        _log_counters(profile.counters)
+        if profile.first_output_seconds is not None:
+            logger.info("첫 출력 행까지 %.3f초 (프로그램 시작 후 %.3f초)",
+                        profile.first_output_seconds, profile.startup_to_first_output_seconds)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            try:
+                profiler.dump_stats(cprofile_file)
+                logger.info("cProfile 결과 저장: %s", cprofile_file)
+            except Exception as e:
+                logger.error("cProfile 결과 저장 중 오류 발생: %s", e)
+        
+        if report_file:
+            try:
+                profile.log_summary()
+                profile.write_report(report_file, input_file=str(input_file),
+                                     output_file=", ".join(_output_files(output_file)),
+                                     merge_mode=merge_mode, streaming=streaming,
+                                     engine=profile.engine or engine, success=success,
+                                     product_parse_cache=parse_product_name.cache_info()._asdict())
+                logger.info("성능 보고서 저장: %s", report_file)
+            except Exception as e:
+                logger.error("성능 보고서 저장 중 오류 발생: %s", e)
+            finally:
+                if started_tracing:
+                    tracemalloc.stop()
+    
+    return success
+
+
+def read_order_rows(input_file, exception_products=(), engine=ENGINE_PANDAS):
+    """
+    입력 파일 하나를 병합 전 OrderRow 목록으로 읽는 함수 (여러 입력 병합 시 작업자 프로세스에서 실행)
+    
+    DataFrame은 이 함수 안에서만 사용하고 OrderRow 목록만 반환하므로, 여러 파일을 병렬로 읽어도
+    호출한 쪽에는 파일별 DataFrame이 쌓이지 않는다.
+    
+    Args:
+        input_file (str): 입력 Excel 파일 경로
+        exception_products (frozenset): 예외 처리할 상품명 집합 (RuleSet.exceptions)
+        engine (str): "pandas" 또는 "openpyxl" (auto는 입력 파일 크기로 선택)
+    
+    Returns:
+        list: OrderRow 목록 (입력 순서)
+    """
+    engine = _resolve_engine(engine, input_file, False, None)
+    with InputWorkbook(input_file) as input_workbook:
+        if engine == ENGINE_OPENPYXL:
+            sheet_rows = input_workbook.iter_order_sheet_rows()
+            column_index = _sheet_column_index(next(sheet_rows, None) or ())
+            available_columns = column_index
+        else:
+            df = input_workbook.read_order_frame()
+            available_columns = df.columns
         
-        # 1. 데이터 전처리 - 필요한 열만 선택
-        required_data = df[[
-            '주문번호', '상태', '상품명-옵션명', '관리용상품명', '수량', 
-            '받는분', '받는분 연락처', '배송지 우편번호', '도로명 주소', '배송메시지'
-        ]].copy()
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in available_columns]
+        if missing_columns:
+            raise ValueError(f"필요한 열이 없습니다: {', '.join(missing_columns)}")
         
-        # 빈 행 제거
-        required_data = required_data[required_data['주문번호'] != '']
+        if engine == ENGINE_OPENPYXL:
+            return list(iter_sheet_order_rows(sheet_rows, column_index, exception_products))
+        return _extract_frame_rows(df, exception_products)
+
+
+def _read_input_rows(input_files, exception_products, engine, workers):
+    """
+    여러 입력 파일을 프로세스 풀에서 병렬로 읽어 입력 파일 순서대로 이어 붙인 OrderRow 목록 반환
+    
+    하나라도 읽지 못하면 일부 채널이 빠진 결과를 만들지 않도록 None을 반환한다.
+    """
+    workers = min(workers or os.cpu_count() or 1, len(input_files))
+    rows = []
+    failed = False
+    with contextlib.ExitStack() as stack:
+        if workers > 1:
+            executor = stack.enter_context(concurrent.futures.ProcessPoolExecutor(max_workers=workers))
+            futures = [executor.submit(read_order_rows, input_file, exception_products, engine)
+                       for input_file in input_files]
+            results = [future.result for future in futures]
+        else:
+            results = [functools.partial(read_order_rows, input_file, exception_products, engine)
+                       for input_file in input_files]
         
-        # 2. 주문 데이터를 리스트로 변환 (행별 처리용)
-        rows = []
-        for _, row in required_data.iterrows():
+        # 파일별 결과는 받는 즉시 하나의 목록으로 합침 (고객 키는 OrderRow.customer_key)
+        for input_file, result in zip(input_files, results):
             try:
-                # 필요한 데이터 추출
-                customer_info = {
-                    'name': row['받는분'],
-                    'phone': row['받는분 연락처'],
-                    'postal_code': row['배송지 우편번호'],
-                    'address': row['도로명 주소'],
-                    'message': row['배송메시지']
-                }
-                
-                product_name = str(row['관리용상품명']).strip()
-                quantity_str = str(row['수량']).strip()
-                quantity = int(quantity_str) if quantity_str and quantity_str.isdigit() else 1
-                
-                # 장수 패턴 추출
-                base_product_name = product_name
-                sheet_count = 0
-                
-                try:
-                    match = re.search(r'(.+?)\s+(\d+)장$', product_name)
-                    if match:
-                        base_product_name = match.group(1).strip()
-                        sheet_count = int(match.group(2))
-                except Exception as e:
-                    print(f"장수 패턴 추출 중 오류: {product_name}, {str(e)}")
-                
-                # 예외 상품인지 확인 - 정확히 일치하는 경우
-                is_exception = product_name in exception_products
-                
-                rows.append({
-                    'customer_info': customer_info,
-                    'product': product_name,
-                    'base_product': base_product_name,
-                    'sheet_count': sheet_count,
-                    'quantity': quantity,
-                    'is_exception': is_exception,
-                    'order_num': row['주문번호']  # 디버깅용으로 주문번호 추가
-                })
+                file_rows = result()
             except Exception as e:
-                print(f"행 처리 중 오류: {str(e)}")
+                logger.error("입력 파일 읽기 중 오류 발생: %s (%s)", input_file, e)
+                failed = True
                 continue
+            logger.info("입력 파일 읽기 완료: %s (%s행)", input_file, len(file_rows))
+            rows.extend(file_rows)
+    return None if failed else rows
+
+
+def _run_transform_files(input_files, output_file, exception_file, merge_mode, rules, workers, engine,
+                         output_format, profile, pack_sheets=False):
+    """transform_excel_files의 실제 변환 처리 (인자 설명은 transform_excel_files 참고)"""
+    try:
+        output_files = _output_files(output_file)
+        for path in output_files:
+            try:
+                resolve_output_format(path, output_format)
+            except ValueError as e:
+                logger.error("오류: %s", e)
+                return False
+        if merge_mode not in MERGE_MODES:
+            logger.error("오류: 알 수 없는 병합 방식: %s (가능한 값: %s)", merge_mode, ', '.join(MERGE_MODES))
+            return False
+        if engine not in ENGINES:
+            logger.error("오류: 알 수 없는 변환 엔진: %s (가능한 값: %s)", engine, ', '.join(ENGINES))
+            return False
         
-        # 3. 행별 순차 비교 및 병합
-        merged_rows = []
-        skip_indices = set()  # 이미 병합된 행 인덱스
+        missing_files = [input_file for input_file in input_files if not os.path.exists(input_file)]
+        if missing_files:
+            logger.error("오류: 입력 파일이 존재하지 않습니다: %s", ', '.join(missing_files))
+            return False
         
-        for i in range(len(rows)):
-            if i in skip_indices:
-                continue  # 이미 병합된 행은 건너뛰기
-            
-            current_row = rows[i]
-            
-            # 예외 상품인 경우 - 개별 처리
-            if current_row['is_exception']:
-                print(f"예외 상품 처리 중: {current_row['product']}, 수량: {current_row['quantity']}")
-                
-                # 예외 상품은 그대로 주문 수량만큼 행 추가
-                for _ in range(current_row['quantity']):
-                    exception_row = [
-                        current_row['customer_info']['name'],
-                        current_row['customer_info']['phone'],
-                        current_row['customer_info']['postal_code'],
-                        current_row['customer_info']['address'],
-                        current_row['customer_info']['message'],
-                        current_row['product'],  # 원본 상품명 그대로 사용
-                        "1"  # 수량은 항상 1
-                    ]
-                    merged_rows.append(exception_row)
-            else:
-                try:
-                    # 일반 상품은 순차 비교하여 병합
-                    customer_key = "_".join([
-                        current_row['customer_info']['name'],
-                        current_row['customer_info']['phone'],
-                        current_row['customer_info']['postal_code'],
-                        current_row['customer_info']['address'],
-                        current_row['customer_info']['message']
-                    ])
-                    
-                    # 현재 행의 병합 대상 상품들
-                    merged_products = []  # 상품명 
-                    merged_quantities = []  # 수량
-                    merged_base_products = []  # 기본 상품명
-                    merged_sheet_counts = []  # 장수 정보
-                    
-                    # 현재 상품 추가
-                    merged_products.append(current_row['product'])
-                    merged_quantities.append(current_row['quantity'])
-                    merged_base_products.append(current_row['base_product'])
-                    merged_sheet_counts.append(current_row['sheet_count'])
-                    
-                    # 다음 행부터 순차적으로 비교
-                    for j in range(i + 1, len(rows)):
-                        if j in skip_indices:
-                            continue  # 이미 병합된 행은 건너뛰기
-                        
-                        next_row = rows[j]
-                        
-                        # 예외 상품인 경우 병합하지 않고 건너뜀
-                        if next_row['is_exception']:
-                            continue
-                        
-                        next_customer_key = "_".join([
-                            next_row['customer_info']['name'],
-                            next_row['customer_info']['phone'],
-                            next_row['customer_info']['postal_code'],
-                            next_row['customer_info']['address'],
-                            next_row['customer_info']['message']
-                        ])
-                        
-                        # 고객 정보가 같으면 병합 가능성 검토
-                        if customer_key == next_customer_key:
-                            try:
-                                # 동일한 상품인지 확인
-                                same_product_found = False
-                                should_skip_merge = False  # 장수 제한으로 병합을 건너뛸지 여부
-                                
-                                for k in range(len(merged_products)):
-                                    product_str = merged_products[k]
-                                    base_product = merged_base_products[k]
-                                    
-                                    # 상품명이 정확히 일치하는 경우 수량만 더함
-                                    if product_str == next_row['product']:
-                                        # 장수 제한 확인
-                                        if base_product in sheet_limits:
-                                            limit = sheet_limits[base_product]
-                                            current_sheets = merged_sheet_counts[k] * merged_quantities[k]
-                                            next_sheets = next_row['sheet_count'] * next_row['quantity']
-                                            total_sheets = current_sheets + next_sheets
-                                            
-                                            if total_sheets > limit:
-                                                print(f"장수 제한 초과: {base_product}의 장수가 {total_sheets}장으로 {limit}장을 초과")
-                                                should_skip_merge = True
-                                                break
-                                        
-                                        if not should_skip_merge:
-                                            merged_quantities[k] += next_row['quantity']
-                                            same_product_found = True
-                                        break
-                                    
-                                    # 기본 상품명이 같은 경우도 병합
-                                    elif base_product == next_row['base_product']:
-                                        # 장수 제한 확인
-                                        if base_product in sheet_limits:
-                                            limit = sheet_limits[base_product]
-                                            # 현재 장수 계산
-                                            current_sheets = 0
-                                            if merged_sheet_counts[k] > 0:
-                                                current_sheets = merged_sheet_counts[k] * merged_quantities[k]
-                                            else:
-                                                current_sheets = merged_quantities[k]
-                                            
-                                            # 다음 장수 계산
-                                            next_sheets = 0
-                                            if next_row['sheet_count'] > 0:
-                                                next_sheets = next_row['sheet_count'] * next_row['quantity']
-                                            else:
-                                                next_sheets = next_row['quantity']
-                                            
-                                            total_sheets = current_sheets + next_sheets
-                                            
-                                            if total_sheets > limit:
-                                                print(f"장수 제한 초과: {base_product}의 장수가 {total_sheets}장으로 {limit}장을 초과")
-                                                should_skip_merge = True
-                                                break
-                                        
-                                        if should_skip_merge:
-                                            break
-                                            
-                                        # 장수 형식 처리
-                                        existing_match = re.search(r'(.+?)\s+(\d+)장$', product_str)
-                                        new_match = re.search(r'(.+?)\s+(\d+)장$', next_row['product'])
-                                        
-                                        if existing_match and new_match:
-                                            # 둘 다 장수가 있는 경우
-                                            existing_sheets = int(existing_match.group(2))
-                                            new_sheets = int(new_match.group(2))
-                                            
-                                            # 장수와 수량 고려하여 합산
-                                            total_sheets = (existing_sheets * merged_quantities[k]) + (new_sheets * next_row['quantity'])
-                                            merged_products[k] = f"{base_product} {total_sheets}장"
-                                            merged_quantities[k] = 1  # 이미 장수에 수량 반영됨
-                                            merged_sheet_counts[k] = total_sheets
-                                            same_product_found = True
-                                            break
-                                        elif existing_match:
-                                            # 기존 상품에만 장수가 있는 경우
-                                            existing_sheets = int(existing_match.group(2))
-                                            total_quantity = merged_quantities[k] + next_row['quantity']
-                                            total_sheets = existing_sheets * total_quantity
-                                            merged_products[k] = f"{base_product} {total_sheets}장"
-                                            merged_quantities[k] = 1  # 이미 장수에 수량 반영됨
-                                            merged_sheet_counts[k] = total_sheets
-                                            same_product_found = True
-                                            break
-                                        elif new_match:
-                                            # 새 상품에만 장수가 있는 경우
-                                            new_sheets = int(new_match.group(2))
-                                            total_quantity = merged_quantities[k] + next_row['quantity']
-                                            total_sheets = new_sheets * total_quantity
-                                            merged_products[k] = f"{base_product} {total_sheets}장"
-                                            merged_quantities[k] = 1  # 이미 장수에 수량 반영됨
-                                            merged_sheet_counts[k] = total_sheets
-                                            same_product_found = True
-                                            break
-                                        else:
-                                            # 둘 다 장수가 없는 경우는 수량만 합산
-                                            merged_quantities[k] += next_row['quantity']
-                                            same_product_found = True
-                                            break
-                                
-                                # 장수 제한으로 건너뛰어야 하는 경우
-                                if should_skip_merge:
-                                    continue
-                                
-                                # 같은 상품을 찾지 못했으면 새로 추가
-                                if not same_product_found:
-                                    merged_products.append(next_row['product'])
-                                    merged_quantities.append(next_row['quantity'])
-                                    merged_base_products.append(next_row['base_product'])
-                                    merged_sheet_counts.append(next_row['sheet_count'])
-                                
-                                skip_indices.add(j)  # 사용된 행 표시
-                            except Exception as e:
-                                print(f"상품 병합 중 오류: {str(e)}")
-                                traceback.print_exc()
-                        else:
-                            # 고객 정보가 다르면 더이상 비교하지 않고 다음 행으로 넘어감
-                            break
-                    
-                    # 상품 정보와 수량을 결합하여 최종 상품 리스트 생성
-                    final_products = []
-                    for prod, qty, sheet_count in zip(merged_products, merged_quantities, merged_sheet_counts):
-                        try:
-                            if sheet_count > 0 and qty > 1:
-                                # 장수 형식이면 장수와 수량을 곱하여 총 장수 계산
-                                match = re.search(r'(.+?)\s+(\d+)장$', prod)
-                                if match:
-                                    base_name = match.group(1).strip()
-                                    total_sheets = sheet_count * qty
-                                    final_products.append(f"{base_name} {total_sheets}장")
-                                else:
-                                    final_products.append(f"{prod} {qty}장")
-                            elif qty > 1:
-                                # 장수 형식이 아니면 수량을 붙여서 표시
-                                final_products.append(f"{prod} {qty}장")
-                            else:
-                                # 수량이 1이면 그대로 사용
-                                final_products.append(prod)
-                        except Exception as e:
-                            print(f"상품 형식 처리 중 오류: {prod}, {str(e)}")
-                            final_products.append(prod)  # 오류 시 원본 사용
-                    
-                    # 일반 상품 병합하여 한 행으로 추가
-                    products_str = " ,".join(final_products)
-                    merged_row = [
-                        current_row['customer_info']['name'],
-                        current_row['customer_info']['phone'],
-                        current_row['customer_info']['postal_code'],
-                        current_row['customer_info']['address'],
-                        current_row['customer_info']['message'],
-                        products_str,
-                        "1"  # 최종 수량은 항상 1
-                    ]
-                    merged_rows.append(merged_row)
-                except Exception as e:
-                    print(f"행 병합 중 오류: {str(e)}")
-                    traceback.print_exc()
-                    # 오류 발생 시 원본 행을 그대로 추가
-                    merged_row = [
-                        current_row['customer_info']['name'],
-                        current_row['customer_info']['phone'],
-                        current_row['customer_info']['postal_code'],
-                        current_row['customer_info']['address'],
-                        current_row['customer_info']['message'],
-                        current_row['product'],
-                        str(current_row['quantity'])
-                    ]
-                    merged_rows.append(merged_row)
+        logger.info("파일 %s개 로딩 중: %s", len(input_files), ', '.join(input_files))
+        
+        # 예외 목록 로드 (캐시된 규칙 재사용)
+        if rules is None:
+            with profile.stage("load_rules"):
+                rules = load_rule_set(exception_file)
+        
+        # 1. 입력 파일별 파싱 (병렬) -> 하나의 주문 행 목록
+        with profile.stage("read_inputs") as stage:
+            rows = _read_input_rows(input_files, rules.exceptions, engine, workers)
+            if rows is None:
+                return False
+            stage['rows'] = len(rows)
+        
+        # 2. 모든 채널의 주문을 같은 규칙으로 한 번만 병합
+        with profile.stage("merge") as stage:
+            merged_rows = merge_rows(rows, rules.sheet_limits, merge_mode, profile.counters, pack_sheets)
+            stage['rows'] = len(merged_rows)
+        del rows
         
         # 데이터가 없는 경우 처리
         if not merged_rows:
-            print("변환할 데이터가 없습니다.")
+            logger.warning("변환할 데이터가 없습니다.")
             return False
         
-        # 새 워크북 생성
-        new_workbook = openpyxl.Workbook()
-        new_sheet = new_workbook.active
-        new_sheet.title = "주문관리목록"  # 첫 번째 시트 이름 설정
+        # 3. 하나의 결과 파일로 기록
+        with _open_output_writers(output_files, output_format) as writers:
+            with profile.stage("write_rows") as stage:
+                stage['rows'] = _write_merged_rows(writers, merged_rows, profile)
+            return _finish_output_writers(writers, None, profile, len(merged_rows))
+    
+    except Exception as e:
+        logger.error("파일 변환 중 오류 발생: %s", e, exc_info=True)
+        return False
+
+
+def transform_excel_files(input_files, output_file="output.xlsx", exception_file="exceptions.json",
+                          merge_mode=MERGE_MODE_GLOBAL, rules=None, workers=None, engine=ENGINE_PANDAS,
+                          output_format=None, report_file=None, pack_sheets=False):
+    """
+    여러 채널의 주문 파일을 함께 병합하여 하나의 결과 파일로 변환하는 함수
+    
+    각 입력 파일은 작업자 프로세스에서 병렬로 읽어 OrderRow 목록으로 만들고, 입력 파일 순서대로
+    이어 붙인 뒤 exceptions.json 규칙으로 한 번만 병합한다. 따라서 여러 채널에서 주문한 고객
+    (받는분, 연락처, 우편번호, 주소, 배송메시지가 모두 같은 고객)도 한 행으로 병합된다.
+    입력 파일의 추가 시트는 복사하지 않는다.
+    
+    Args:
+        input_files (list): 입력 Excel 파일 경로 목록 (transform_excel_file과 같은 형식)
+        output_file (str | list): 출력 파일 경로 또는 경로 목록
+        exception_file (str): 예외 목록 JSON 파일 경로
+        merge_mode (str): "global"(기본값, 파일이 달라도 같은 고객이면 병합) 또는
+                          "contiguous"(이어 붙인 순서에서 연속된 동일 고객 행만 병합)
+        rules (RuleSet): 미리 로드한 예외 규칙 (지정하면 exception_file을 읽지 않음)
+        workers (int): 입력 파일을 읽을 작업자 프로세스 수 (기본값: CPU 코어 수, 1이면 현재 프로세스에서 읽음)
+        engine (str): 입력 파일을 읽을 엔진 ("pandas", "openpyxl", "auto")
+        output_format (str): 출력 형식 (transform_excel_file 참고)
+        report_file (str): 단계별 소요 시간/행 수와 처리 건수를 기록할 JSON 파일
+        pack_sheets (bool): 장수 한계 묶음 나누기 사용 여부 (transform_excel_file 참고)
+    
+    Returns:
+        bool: 변환 성공 여부
+    """
+    input_files = [str(input_file) for input_file in input_files]
+    profile = ConversionProfile()
+    
+    success = False
+    try:
+        success = _run_transform_files(input_files, output_file, exception_file, merge_mode, rules, workers,
+                                       engine, output_format, profile, pack_sheets)
+        _log_counters(profile.counters)
+    finally:
+        if report_file:
+            try:
+                profile.log_summary()
+                profile.write_report(report_file, input_file=", ".join(input_files),
+                                     output_file=", ".join(_output_files(output_file)),
+                                     merge_mode=merge_mode, engine=engine, success=success,
+                                     product_parse_cache=parse_product_name.cache_info()._asdict())
+                logger.info("성능 보고서 저장: %s", report_file)
+            except Exception as e:
+                logger.error("성능 보고서 저장 중 오류 발생: %s", e)
+    
+    return success
+
+
+class TransformResult:
+    """
+    Transformer 변환 결과
+    
+    Attributes:
+        success (bool): 변환 성공 여부 (결과 객체 자체도 bool로 사용 가능)
+        data (bytes): 출력 파일 내용 (transform 결과, 실패하면 None)
+        rows (list): 출력 행 목록 (transform_dataframe 결과, 실패하면 None)
+        stats (dict): 처리 건수 (input_rows, output_rows, merged_lines, exception_lines 등)
+        stages (list): 단계별 소요 시간/행 수
+        errors (list): 건너뛴 행과 입력 오류 - {'row': 입력 시트 행 번호, 'order_num': 주문번호, 'error': 오류 메시지}
+                       (파일 단위 오류는 row, order_num이 None)
+    """
+    
+    def __init__(self, success, profile, data=None, rows=None):
+        self.success = success
+        self.data = data
+        self.rows = rows
+        self.stats = dict(profile.counters)
+        self.stages = profile.stages
+        self.errors = profile.errors
+    
+    def __bool__(self):
+        return self.success
+    
+    def __repr__(self):
+        return f"TransformResult(success={self.success}, stats={self.stats}, errors={len(self.errors)})"
+
+
+class Transformer:
+    """
+    예외 규칙과 변환 옵션을 한 번만 설정하여 재사용하는 변환기
+    
+    입력과 출력을 메모리에서 주고받으므로 파일 경로 없이 웹 서비스 등에 넣어 사용할 수 있다.
+    단, xlsx 출력은 openpyxl이 시트 내용을 임시 파일에 쓴 뒤 저장이 끝나면 지우므로 임시 폴더에
+    쓰기 권한이 필요하다 (csv/tsv/parquet 출력과 transform_dataframe은 임시 파일을 쓰지 않음).
+    설정은 만든 뒤 바뀌지 않고 호출마다 상태를 따로 만들므로, 하나의 객체를 여러 스레드에서
+    동시에 사용해도 된다.
+    
+    Args:
+        rules (RuleSet): 예외 규칙 (지정하지 않으면 exception_file에서 로드)
+        exception_file (str): 예외 목록 JSON 파일 경로 (기본값: exceptions.json)
+        merge_mode (str): "contiguous"(기본값) 또는 "global"
+        engine (str): "pandas"(기본값), "openpyxl" 또는 "auto"(입력이 작으면 openpyxl)
+        output_format (str): transform의 출력 형식 (기본값: xlsx, 외에 csv/tsv/parquet)
+        pack_sheets (bool): 장수 한계 묶음 나누기 사용 여부 (transform_excel_file 참고)
+    
+    예:
+        transformer = Transformer(exception_file="exceptions.json")
+        result = transformer.transform(uploaded_bytes)
+        if result:
+            response_body = result.data
+    """
+    
+    def __init__(self, rules=None, exception_file="exceptions.json", merge_mode=MERGE_MODE_CONTIGUOUS,
+                 engine=ENGINE_PANDAS, output_format=OUTPUT_FORMAT_XLSX, pack_sheets=False):
+        if merge_mode not in MERGE_MODES:
+            raise ValueError(f"알 수 없는 병합 방식: {merge_mode} (가능한 값: {', '.join(MERGE_MODES)})")
+        if engine not in ENGINES:
+            raise ValueError(f"알 수 없는 변환 엔진: {engine} (가능한 값: {', '.join(ENGINES)})")
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"알 수 없는 출력 형식: {output_format} (가능한 값: {', '.join(OUTPUT_FORMATS)})")
+        
+        self.rules = load_rule_set(exception_file) if rules is None else rules
+        self.merge_mode = merge_mode
+        self.engine = engine
+        self.output_format = output_format
+        self.pack_sheets = pack_sheets
+    
+    def transform(self, source):
+        """
+        Excel 파일 내용을 변환하여 출력 파일 내용을 반환
         
-        # 변환된 데이터 입력 - 모든 셀을 문자열로 저장
-        for row_idx, row_data in enumerate(merged_rows, 1):
-            for col_idx, cell_value in enumerate(row_data, 1):
-                cell = new_sheet.cell(row=row_idx, column=col_idx)
-                cell.value = cell_value
-                
-                # 전화번호(B열)는 문자열 서식 적용
-                if col_idx == 2:  # B열 (전화번호)
-                    cell.number_format = '@'  # 문자열 형식 지정
+        Args:
+            source (bytes | file-like): 입력 xlsx 파일 내용 또는 바이너리 파일 객체
         
-        # 원본 워크북의 다른 시트 복사 (안전하게 처리)
+        Returns:
+            TransformResult: data에 output_format 형식의 출력 파일 내용(bytes)
+        """
+        profile = ConversionProfile()
+        output_buffer = io.BytesIO()
+        success = False
         try:
-            # 데이터만 읽기 옵션 (스타일 제외)
-            original_workbook = openpyxl.load_workbook(input_file, read_only=True, data_only=True)
-            original_sheets = original_workbook.sheetnames
+            if not isinstance(source, (bytes, bytearray, memoryview)):
+                source = source.read()
+            input_buffer = io.BytesIO(source)
+            engine = _resolve_engine(self.engine, input_buffer, False, None)
             
-            # 첫 번째 시트 이외의 다른 시트가 있는 경우에만 복사 시도
-            if len(original_sheets) > 1:
-                print("추가 시트 복사 중...")
-                for sheet_name in original_sheets[1:]:
-                    source_sheet = original_workbook[sheet_name]
-                    target_sheet = new_workbook.create_sheet(title=sheet_name)
-                    
-                    # 데이터만 복사 (스타일 제외)
-                    for row in source_sheet.iter_rows(values_only=True):
-                        target_sheet.append(row)
+            with profile.stage("open_input"):
+                input_workbook = InputWorkbook(input_buffer)
+            with input_workbook:
+                if engine == ENGINE_OPENPYXL:
+                    success = _transform_excel_file_streaming(input_workbook, [output_buffer], self.rules,
+                                                              self.merge_mode, profile, self.output_format,
+                                                              self.pack_sheets)
+                else:
+                    success = _transform_excel_file_dataframe(input_workbook, [output_buffer], self.rules,
+                                                              self.merge_mode, profile,
+                                                              output_format=self.output_format,
+                                                              pack_sheets=self.pack_sheets)
         except Exception as e:
-            print(f"추가 시트 복사 중 오류 발생: {str(e)}")
-            print("주요 데이터는 처리되었으며, 추가 시트 복사는 건너뜁니다.")
+            logger.error("파일 변환 중 오류 발생: %s", e, exc_info=True)
+            profile.errors.append({'row': None, 'order_num': None, 'error': str(e)})
+            success = False
+        
+        return TransformResult(success, profile, data=output_buffer.getvalue() if success else None)
+    
+    def transform_dataframe(self, df):
+        """
+        주문 DataFrame을 병합하여 출력 행 목록을 반환 (파일을 만들지 않음)
+        
+        Args:
+            df (DataFrame): 입력 첫 번째 시트와 같은 열을 가진 주문 데이터 (행 순서 = 입력 시트 행 순서)
         
-        # 결과 파일 저장
+        Returns:
+            TransformResult: rows에 출력 행 목록 (각 행은 7개 열의 문자열 리스트)
+        """
+        profile = ConversionProfile()
         try:
-            new_workbook.save(output_file)
-            print(f"파일 변환 완료: {output_file}")
-            return True
-        except Exception as e:
-            print(f"파일 저장 중 오류 발생: {str(e)}")
-            return False
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+            if missing_columns:
+                _missing_columns_error(missing_columns, profile)
+                return TransformResult(False, profile)
             
-    except Exception as e:
-        print(f"파일 변환 중 오류 발생: {str(e)}")
-        traceback.print_exc()
-        return False
+            with profile.stage("extract_rows") as stage:
+                # 값은 openpyxl 엔진과 같은 규칙(_cell_text)으로 문자열로 바꾸고(2.0 -> "2"), 인덱스는 입력 시트 행 순서로 맞춤
+                frame = df[REQUIRED_COLUMNS].reset_index(drop=True)
+                frame = frame.apply(lambda column: column.map(_cell_text).mask(column.isna(), ''))
+                rows = _extract_frame_rows(frame, self.rules.exceptions, profile.errors)
+                stage['rows'] = len(rows)
+            
+            with profile.stage("merge") as stage:
+                merged_rows = merge_rows(rows, self.rules.sheet_limits, self.merge_mode, profile.counters,
+                                         self.pack_sheets)
+                stage['rows'] = len(merged_rows)
+        except Exception as e:
+            logger.error("데이터 변환 중 오류 발생: %s", e, exc_info=True)
+            profile.errors.append({'row': None, 'order_num': None, 'error': str(e)})
+            return TransformResult(False, profile)
+        
+        return TransformResult(True, profile, rows=merged_rows)
 
 
 # 예외 목록을 생성하는 함수
@@ -421,21 +1948,472 @@ def create_exception_list(exception_list, output_file="exceptions.json"):
         data = {"exception_products": exception_list}
         with open(output_file, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
-        print(f"예외 목록 파일 생성 완료: {output_file}")
+        logger.info("예외 목록 파일 생성 완료: %s", output_file)
         return True
     except Exception as e:
-        print(f"예외 목록 파일 생성 중 오류 발생: {str(e)}")
+        logger.error("예외 목록 파일 생성 중 오류 발생: %s", e)
+        return False
+
+
+# 일괄 변환 시 결과 파일 이름에 붙는 접미사
+BATCH_OUTPUT_SUFFIX = "_output"
+
+
+def collect_input_files(pattern):
+    """
+    일괄 변환할 입력 파일 목록을 찾는 함수
+    
+    Args:
+        pattern (str): 폴더 경로(폴더 안의 *.xlsx) 또는 glob 패턴 (예: "exports/*.xlsx")
+    
+    Returns:
+        list: 정렬된 입력 파일 경로 목록 (Excel 임시 파일과 변환 결과 파일은 제외)
+    """
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.xlsx")
+    
+    input_files = []
+    for path in sorted(glob.glob(pattern)):
+        name = os.path.basename(path)
+        stem = os.path.splitext(name)[0]
+        if name.startswith("~$") or stem.endswith(BATCH_OUTPUT_SUFFIX) or not os.path.isfile(path):
+            continue
+        input_files.append(path)
+    return input_files
+
+
+def _transform_batch_file(input_file, output_file, log_file, exception_file, options, log_level=logging.INFO,
+                          jsonl=False):
+    """
+    일괄 변환 작업자 프로세스에서 파일 하나를 변환하는 함수
+    
+    변환 중 출력되는 메시지는 파일별 로그 파일에 기록한다 (jsonl이면 <로그 파일>.jsonl도 기록).
+    
+    Returns:
+        dict: 입력/출력/로그 경로, 성공 여부, 새 주문 없음 여부(증분 변환), 소요 시간(초), 오류 메시지
+    """
+    start_time = time.perf_counter()
+    error = ""
+    no_new_orders = False
+    try:
+        with open(log_file, 'w', encoding='utf-8') as log:
+            configure_logging(log_level, log_file + ".jsonl" if jsonl else None, stream=log)
+            try:
+                with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                    success = transform_excel_file(input_file, output_file, exception_file, **options)
+            finally:
+                configure_logging(log_level)
+        # 증분 변환에서 새 주문이 없으면 결과 파일 없이 성공으로 처리
+        if success is None:
+            success = no_new_orders = True
+            output_file = ""
+        if not success:
+            error = "변환 실패 (로그 확인)"
+    except Exception as e:
+        success = False
+        error = str(e)
+    
+    return {
+        'input_file': input_file,
+        'output_file': output_file,
+        'log_file': log_file,
+        'success': success,
+        'no_new_orders': no_new_orders,
+        'seconds': time.perf_counter() - start_time,
+        'error': error
+    }
+
+
+def log_batch_summary(results):
+    """일괄 변환 결과를 파일별 성공/실패와 소요 시간 표로 출력"""
+    name_width = max([len(os.path.basename(r['input_file'])) for r in results] + [4])
+    logger.info("")
+    logger.info("%s  %s  %s  비고", f"{'파일':<{name_width}}", f"{'결과':<4}", f"{'시간(초)':>8}")
+    logger.info("-" * (name_width + 30))
+    for r in results:
+        status = "성공" if r['success'] else "실패"
+        if r.get('no_new_orders'):
+            note = "새 주문 없음 (결과 파일 없음)"
+        else:
+            note = r['output_file'] if r['success'] else f"{r['error']} - {r['log_file']}"
+        logger.info("%s  %s  %8.2f  %s", f"{os.path.basename(r['input_file']):<{name_width}}", f"{status:<4}",
+                    r['seconds'], note)
+    logger.info("-" * (name_width + 30))
+    
+    succeeded = sum(1 for r in results if r['success'])
+    total_seconds = sum(r['seconds'] for r in results)
+    logger.info("전체 %s개 중 성공 %s개, 실패 %s개 (작업 시간 합계 %.2f초)",
+                len(results), succeeded, len(results) - succeeded, total_seconds)
+
+
+def transform_batch(pattern, output_dir="output", exception_file="exceptions.json", workers=None, profile=False,
+                    log_level=logging.INFO, jsonl=False, **options):
+    """
+    여러 입력 파일을 프로세스 풀에서 병렬로 변환하는 함수
+    
+    각 파일은 output_dir에 "<원본 이름>_output.xlsx"(output_format을 지정하면 해당 확장자)로 저장되고, 변환 메시지는
+    output_dir/logs/<원본 이름>.log에 파일별로 기록된다. 끝나면 결과 요약 표를 출력한다.
+    
+    Args:
+        pattern (str): 입력 폴더 경로 또는 glob 패턴
+        output_dir (str): 결과 파일을 저장할 폴더 (기본값: output)
+        exception_file (str): 예외 목록 JSON 파일 경로
+        workers (int): 작업자 프로세스 수 (기본값: CPU 코어 수)
+        profile (bool): True이면 파일별 성능 보고서를 output_dir/logs/<원본 이름>.profile.json에 저장
+        log_level (int): 파일별 로그에 기록할 최소 로그 수준
+        jsonl (bool): True이면 파일별 로그를 JSON Lines 형식(<원본 이름>.log.jsonl)으로도 기록
+        **options: transform_excel_file에 전달할 추가 옵션 (merge_mode, streaming, rules, checkpoint_file,
+                   engine, output_format, pack_sheets)
+    
+    Returns:
+        list: 파일별 결과 dict 목록 (입력 파일 순서)
+    """
+    input_files = collect_input_files(pattern)
+    if not input_files:
+        logger.error("오류: 변환할 파일이 없습니다: %s", pattern)
+        return []
+    
+    log_dir = os.path.join(output_dir, "logs")
+    os.makedirs(log_dir, exist_ok=True)
+    
+    # 예외 규칙은 한 번만 로드하여 모든 작업자에 전달
+    if options.get('rules') is None:
+        options['rules'] = load_rule_set(exception_file)
+    
+    # 결과 파일 확장자는 출력 형식을 따름 (기본값: .xlsx)
+    extension = "." + (options.get('output_format') or OUTPUT_FORMAT_XLSX)
+    jobs = []
+    for input_file in input_files:
+        stem = os.path.splitext(os.path.basename(input_file))[0]
+        output_file = os.path.join(output_dir, f"{stem}{BATCH_OUTPUT_SUFFIX}{extension}")
+        if options.get('checkpoint_file'):
+            # 증분 변환 결과는 이전 실행의 결과 파일을 덮어쓰지 않음
+            output_file = _unique_path(output_file)
+        jobs.append((input_file, output_file, os.path.join(log_dir, f"{stem}.log")))
+    
+    workers = min(workers or os.cpu_count() or 1, len(jobs))
+    logger.info("일괄 변환 시작: %s개 파일, 작업자 %s개", len(jobs), workers)
+    
+    results = [None] * len(jobs)
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for idx, (input_file, output_file, log_file) in enumerate(jobs):
+            file_options = dict(options)
+            if profile:
+                file_options['report_file'] = os.path.splitext(log_file)[0] + ".profile.json"
+            future = executor.submit(_transform_batch_file, input_file, output_file, log_file, exception_file,
+                                     file_options, log_level, jsonl)
+            futures[future] = idx
+        for future in concurrent.futures.as_completed(futures):
+            idx = futures[future]
+            input_file, output_file, log_file = jobs[idx]
+            try:
+                results[idx] = future.result()
+            except Exception as e:
+                # 작업자 프로세스가 비정상 종료된 경우
+                results[idx] = {
+                    'input_file': input_file,
+                    'output_file': output_file,
+                    'log_file': log_file,
+                    'success': False,
+                    'seconds': 0.0,
+                    'error': str(e)
+                }
+            status = "완료" if results[idx]['success'] else "실패"
+            logger.info("[%s] %s (%.2f초)", status, input_file, results[idx]['seconds'])
+    
+    log_batch_summary(results)
+    return results
+
+
+def _warm_up_worker(engine=ENGINE_PANDAS):
+    """작업자 프로세스를 미리 띄워 변환에 쓸 무거운 모듈을 로드해 두는 작업"""
+    import openpyxl  # noqa: F401
+    if engine != ENGINE_OPENPYXL:
+        import pandas  # noqa: F401
+    return os.getpid()
+
+
+def _start_worker_pool(workers, engine=ENGINE_PANDAS):
+    """작업자 프로세스 풀을 만들고 모든 작업자에 무거운 모듈을 미리 로드"""
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    for future in [executor.submit(_warm_up_worker, engine) for _ in range(workers)]:
+        future.result()
+    return executor
+
+
+def _unique_path(path):
+    """같은 이름의 파일이 있으면 이름 뒤에 시각을 붙인 경로를 반환"""
+    if not os.path.exists(path):
+        return path
+    stem, ext = os.path.splitext(path)
+    candidate = f"{stem}_{time.strftime('%Y%m%d_%H%M%S')}{ext}"
+    counter = 1
+    while os.path.exists(candidate):
+        candidate = f"{stem}_{time.strftime('%Y%m%d_%H%M%S')}_{counter}{ext}"
+        counter += 1
+    return candidate
+
+
+def _is_file_ready(path):
+    """다른 프로그램이 아직 쓰고 있지 않은지 확인 (Windows에서는 쓰는 중인 파일을 열 수 없음)"""
+    try:
+        with open(path, 'ab'):
+            pass
+        return True
+    except OSError:
         return False
 
 
+def watch_folder(inbox="inbox", outbox="outbox", exception_file="exceptions.json", workers=None, poll_interval=2.0,
+                 log_level=logging.INFO, jsonl=False, max_polls=None, **options):
+    """
+    입력 폴더를 감시하며 새 파일이 들어오면 바로 변환하는 상주 서비스
+    
+    작업자 프로세스 풀과 예외 규칙을 계속 유지하므로 파일마다 pandas/openpyxl 로드와
+    exceptions.json 파싱 비용이 들지 않는다. 예외 목록 파일이 바뀌면 다음 파일부터 새 규칙을 쓴다.
+    
+    파일은 크기/수정 시각이 두 번 연속 같고 다른 프로그램이 쓰고 있지 않을 때 변환을 시작한다.
+    작업자 프로세스가 비정상 종료되면(메모리 부족 등) 작업자 풀을 다시 만들어 서비스를 계속한다.
+    그때 변환 중이던 파일이 하나면 그 파일을 실패로 처리하고, 여러 개면 어느 파일 때문인지 알 수
+    없으므로 각 파일을 새 작업자 풀에서 하나씩 따로 다시 변환하여 원인 파일만 실패로 처리한다.
+    결과는 outbox에 "<원본 이름>_output.xlsx"(output_format을 지정하면 해당 확장자)로, 로그는 outbox/logs에 저장되며, 원본 파일은
+    성공하면 inbox/processed, 실패하면 inbox/failed로 옮겨진다.
+    
+    Args:
+        inbox (str): 감시할 입력 폴더
+        outbox (str): 결과 파일을 저장할 폴더
+        exception_file (str): 예외 목록 JSON 파일 경로
+        workers (int): 작업자 프로세스 수 (기본값: CPU 코어 수)
+        poll_interval (float): 입력 폴더 확인 간격(초)
+        log_level (int): 파일별 로그에 기록할 최소 로그 수준
+        jsonl (bool): True이면 파일별 로그를 JSON Lines 형식으로도 기록
+        max_polls (int): 지정하면 이 횟수만큼 확인한 뒤 남은 작업을 마치고 종료 (기본값: Ctrl+C까지 계속)
+        **options: transform_excel_file에 전달할 추가 옵션 (merge_mode, streaming, checkpoint_file, engine,
+                   output_format, pack_sheets)
+    
+    Returns:
+        list: 처리한 파일별 결과 dict 목록
+    """
+    processed_dir = os.path.join(inbox, "processed")
+    failed_dir = os.path.join(inbox, "failed")
+    log_dir = os.path.join(outbox, "logs")
+    for folder in (inbox, outbox, processed_dir, failed_dir, log_dir):
+        os.makedirs(folder, exist_ok=True)
+    
+    workers = workers or os.cpu_count() or 1
+    engine = options.get('engine', ENGINE_PANDAS)
+    extension = "." + (options.get('output_format') or OUTPUT_FORMAT_XLSX)
+    
+    # 작업자를 미리 띄워 첫 파일부터 바로 변환되도록 함
+    executor = _start_worker_pool(workers, engine)
+    pool_generation = 0  # 작업자 풀을 다시 만든 횟수 (작업이 어느 풀에서 실행됐는지 구분)
+    logger.info("폴더 감시 시작: %s -> %s (작업자 %s개, %.1f초 간격, 종료: Ctrl+C)",
+                inbox, outbox, workers, poll_interval)
+    
+    last_signatures = {}  # 입력 파일 -> 이전 확인 때의 (크기, 수정 시각)
+    running = {}  # future -> (작업 인자, 작업자 풀 번호)
+    suspects = collections.deque()  # 작업자 비정상 종료 원인 후보 - 하나씩 따로 다시 변환할 작업
+    results = []
+    
+    def restart_pool():
+        nonlocal executor, pool_generation
+        logger.error("작업자 프로세스가 비정상 종료되어 작업자 풀을 다시 시작합니다.")
+        executor.shutdown(wait=False, cancel_futures=True)
+        executor = _start_worker_pool(workers, engine)
+        pool_generation += 1
+    
+    def submit(job):
+        try:
+            future = executor.submit(_transform_batch_file, *job)
+        except concurrent.futures.process.BrokenProcessPool:
+            restart_pool()
+            future = executor.submit(_transform_batch_file, *job)
+        running[future] = (job, pool_generation)
+    
+    def finish_done_jobs(wait=False):
+        while True:
+            done = list(running) if wait else [future for future in running if future.done()]
+            crashed = []
+            for future in done:
+                job, generation = running.pop(future)
+                try:
+                    result = future.result()
+                except concurrent.futures.process.BrokenProcessPool as e:
+                    crashed.append((job, generation, e))
+                    continue
+                except Exception as e:
+                    result = {'input_file': job[0], 'output_file': "", 'log_file': "", 'success': False,
+                              'seconds': 0.0, 'error': str(e)}
+                record_result(job[0], result)
+            
+            if crashed:
+                # 현재 풀에서 실행된 작업이 비정상 종료된 경우에만 풀을 다시 만듦 (이미 다시 만든 풀이면 그대로 사용)
+                if any(generation == pool_generation for _, generation, _ in crashed):
+                    restart_pool()
+                if len(crashed) == 1:
+                    job, _, error = crashed[0]
+                    record_result(job[0], {'input_file': job[0], 'output_file': "", 'log_file': job[2],
+                                           'success': False, 'seconds': 0.0,
+                                           'error': f"작업자 프로세스 비정상 종료 ({error})"})
+                else:
+                    for job, _, _ in crashed:
+                        logger.warning("작업자 비정상 종료로 다시 변환합니다: %s", job[0])
+                        suspects.append(job)
+            
+            # 원인 후보는 다른 작업 없이 하나씩 변환하여 다시 비정상 종료되면 그 파일만 실패로 처리
+            if suspects and not running:
+                submit(suspects.popleft())
+            if not (wait and running):
+                return
+    
+    def record_result(input_file, result):
+        target_dir = processed_dir if result['success'] else failed_dir
+        try:
+            shutil.move(input_file, _unique_path(os.path.join(target_dir, os.path.basename(input_file))))
+        except OSError as e:
+            logger.error("입력 파일 이동 중 오류 발생: %s, %s", input_file, e)
+        last_signatures.pop(input_file, None)
+        
+        if result.get('no_new_orders'):
+            logger.info("[완료] %s -> 새 주문 없음 (%.2f초)", input_file, result['seconds'])
+        elif result['success']:
+            logger.info("[완료] %s -> %s (%.2f초)", input_file, result['output_file'], result['seconds'])
+        else:
+            logger.error("[실패] %s: %s (%s)", input_file, result['error'], result['log_file'])
+        results.append(result)
+    
+    polls = 0
+    try:
+        while max_polls is None or polls < max_polls:
+            polls += 1
+            finish_done_jobs()
+            
+            # 캐시된 규칙 사용 - 예외 목록 파일이 바뀐 경우에만 다시 읽음
+            rules = options.get('rules')
+            if rules is None:
+                rules = load_rule_set(exception_file)
+            in_progress = {job[0] for job, _ in running.values()}
+            
+            for input_file in collect_input_files(inbox):
+                if suspects:
+                    break  # 원인 후보를 모두 확인할 때까지 새 파일은 대기
+                if input_file in in_progress:
+                    continue
+                try:
+                    stat = os.stat(input_file)
+                except OSError:
+                    continue
+                
+                # 크기/수정 시각이 바뀌는 중이면 아직 쓰는 중으로 보고 다음 확인까지 대기
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if last_signatures.get(input_file) != signature:
+                    last_signatures[input_file] = signature
+                    continue
+                if not _is_file_ready(input_file):
+                    continue
+                
+                stem = os.path.splitext(os.path.basename(input_file))[0]
+                output_file = _unique_path(os.path.join(outbox, f"{stem}{BATCH_OUTPUT_SUFFIX}{extension}"))
+                log_file = _unique_path(os.path.join(log_dir, f"{stem}.log"))
+                file_options = dict(options, rules=rules)
+                submit((input_file, output_file, log_file, exception_file, file_options, log_level, jsonl))
+                logger.info("변환 시작: %s", input_file)
+            
+            time.sleep(poll_interval)
+        
+        finish_done_jobs(wait=True)
+    except KeyboardInterrupt:
+        logger.info("감시를 종료합니다. 진행 중인 변환이 끝날 때까지 기다립니다...")
+        finish_done_jobs(wait=True)
+    finally:
+        executor.shutdown(wait=True)
+    
+    return results
+
+
+def parse_args(argv=None):
+    """명령줄 인자 해석 - 인자가 없으면 기존과 같이 input.xlsx를 output.xlsx로 변환"""
+    parser = argparse.ArgumentParser(description="주문 Excel 파일을 배송 목록 형식으로 변환")
+    parser.add_argument("--input", nargs="+", default=["input.xlsx"],
+                        help="입력 파일 - 여러 개를 지정하면 모든 채널의 주문을 함께 병합하여 하나의 결과로 저장 "
+                             "(--checkpoint/--streaming/--cprofile과 함께 사용 불가, 기본값: input.xlsx)")
+    parser.add_argument("--output", nargs="+",
+                        help="출력 파일 - 여러 개를 지정하면 한 번 병합한 결과를 모두에 기록 "
+                             "(확장자로 형식 선택: .xlsx/.csv/.tsv/.parquet, 기본값: output.xlsx, "
+                             "--format을 지정하면 output.<형식>)")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, dest="output_format",
+                        help="출력 형식 (지정하지 않으면 출력 파일 확장자로 선택, 확장자와 다르면 오류, "
+                             "일괄 변환/폴더 감시 결과에도 적용)")
+    parser.add_argument("--exceptions", default="exceptions.json", help="예외 목록 파일 (기본값: exceptions.json)")
+    parser.add_argument("--merge-mode", choices=MERGE_MODES,
+                        help="병합 방식 (기본값: contiguous, 입력 파일이 여러 개이면 global)")
+    parser.add_argument("--streaming", action="store_true", help="대용량 파일용 스트리밍 모드")
+    parser.add_argument("--pack-sheets", action="store_true",
+                        help="장수 한계를 넘는 상품을 고객/상품별로 최소 묶음으로 나누어 출력 행(송장) 수를 줄임 "
+                             "(병합한 장수가 한계 이하인 상품은 기본 병합과 같게 출력)")
+    parser.add_argument("--engine", choices=ENGINES, default=ENGINE_PANDAS,
+                        help="변환 엔진 - openpyxl은 pandas 없이 변환 (작은 파일용), auto는 파일 크기로 선택 (기본값: pandas)")
+    parser.add_argument("--checkpoint", metavar="FILE",
+                        help="증분 변환 기록 파일 (SQLite). 지정하면 이전에 처리한 주문은 건너뛰고 새 주문만 출력")
+    parser.add_argument("--profile", metavar="REPORT",
+                        help="단계별 소요 시간/메모리/처리 건수를 JSON 보고서로 저장 (일괄 변환 시 파일별로 logs 폴더에 저장)")
+    parser.add_argument("--cprofile", metavar="FILE", help="cProfile 결과 저장 파일 (단일 파일 변환)")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="행 단위 메시지(예외 상품 처리, 장수 제한 초과)까지 모두 출력")
+    parser.add_argument("-q", "--quiet", action="store_true", help="경고와 오류만 출력")
+    parser.add_argument("--log-jsonl", metavar="FILE",
+                        help="로그를 JSON Lines 파일로도 기록 (일괄 변환 시에는 파일별로 logs 폴더에 기록)")
+    parser.add_argument("--batch", metavar="PATTERN",
+                        help="폴더 또는 glob 패턴의 파일을 모두 변환 (예: exports 또는 \"exports/*.xlsx\")")
+    parser.add_argument("--output-dir", default="output", help="일괄 변환 결과 폴더 (기본값: output)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="일괄 변환/폴더 감시/여러 입력 병합 작업자 프로세스 수 (기본값: CPU 코어 수)")
+    parser.add_argument("--watch", metavar="INBOX", help="입력 폴더를 감시하며 새 파일을 바로 변환하는 상주 모드")
+    parser.add_argument("--outbox", default="outbox", help="폴더 감시 결과 폴더 (기본값: outbox)")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="폴더 감시 확인 간격(초) (기본값: 2)")
+    args = parser.parse_args(argv)
+    if args.output is None:
+        # 일괄 변환/폴더 감시와 같이 출력 형식으로 기본 출력 파일 확장자 결정
+        args.output = [f"output.{args.output_format or OUTPUT_FORMAT_XLSX}"]
+    return args
+
+
 if __name__ == "__main__":
+    args = parse_args()
+    log_level = logging.DEBUG if args.verbose else logging.WARNING if args.quiet else logging.INFO
+    configure_logging(log_level, None if args.batch or args.watch else args.log_jsonl)
+    
+    options = {'merge_mode': args.merge_mode or MERGE_MODE_CONTIGUOUS, 'streaming': args.streaming, 'checkpoint_file': args.checkpoint,
+               'engine': args.engine, 'output_format': args.output_format, 'pack_sheets': args.pack_sheets}
+    
+    if args.watch:
+        # 폴더 감시 상주 모드 실행
+        watch_folder(args.watch, args.outbox, args.exceptions, args.workers, args.poll_interval,
+                     log_level, bool(args.log_jsonl), **options)
+    elif args.batch:
+        # 일괄 변환 실행
+        transform_batch(args.batch, args.output_dir, args.exceptions, args.workers, bool(args.profile),
+                        log_level, bool(args.log_jsonl), **options)
+    elif len(args.input) > 1 and (args.checkpoint or args.streaming or args.cprofile):
+        # 여러 입력 병합은 증분 변환/스트리밍/cProfile을 지원하지 않음 - 조용히 무시하면 전체 주문이 다시 출력됨
+        unsupported = [name for name, value in (("--checkpoint", args.checkpoint), ("--streaming", args.streaming),
+                                                ("--cprofile", args.cprofile)) if value]
+        logger.error("오류: 입력 파일이 여러 개이면 %s 옵션을 사용할 수 없습니다.", ", ".join(unsupported))
+        sys.exit(2)
+    elif len(args.input) > 1:
+        # 여러 채널의 입력 파일을 함께 병합
+        transform_excel_files(args.input, args.output, args.exceptions, args.merge_mode or MERGE_MODE_GLOBAL,
+                              workers=args.workers, engine=args.engine, output_format=args.output_format,
+                              report_file=args.profile, pack_sheets=args.pack_sheets)
     # 입력 파일 존재 확인
-    if not os.path.exists("input.xlsx"):
-        print("오류: 'input.xlsx' 파일이 현재 폴더에 존재하지 않습니다.")
+    elif not os.path.exists(args.input[0]):
+        logger.error("오류: '%s' 파일이 현재 폴더에 존재하지 않습니다.", args.input[0])
     else:
         # 예외 처리 예시 (필요시 사용)
         # exception_products = ["특별 상품명1", "합치지 않을 상품명2"]
         # create_exception_list(exception_products)
         
         # 파일 변환 실행
-        transform_excel_file()
\ No newline at end of file
+        transform_excel_file(args.input[0], args.output, args.exceptions, report_file=args.profile,
+                             cprofile_file=args.cprofile, **options)
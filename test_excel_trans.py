@@ -0,0 +1,398 @@
+import collections
+import csv
+import io
+import logging
+import os
+import random
+
+import pytest
+
+import excel_trans
+from excel_trans import (OUTPUT_COLUMNS, REQUIRED_COLUMNS, ConversionProfile, OrderCheckpoint, OrderRow, RuleSet,
+                         Transformer, _open_output_writers, _write_merged_rows, create_output_writer,
+                         iter_merged_rows, load_rule_set, pack_sheet_lines, parse_args, parse_product_name,
+                         resolve_output_format, transform_excel_file, transform_excel_files)
+
+
+CUSTOMER = ("홍길동", "010-0000-0000", "12345", "서울시 중구 1", "")
+
+
+def make_row(product, quantity, customer=CUSTOMER, order_num="", is_exception=False):
+    """테스트용 주문 행 생성"""
+    parsed = parse_product_name(product)
+    return OrderRow(customer, "_".join(customer), product, parsed.base_name, parsed.sheet_count,
+                    quantity, is_exception, order_num)
+
+
+def customer(name):
+    return (name,) + CUSTOMER[1:]
+
+
+# 병합 결과 표 - (주문 행 [(고객, 상품명, 수량, 예외 여부)], 장수 한계, 병합 방식, 출력 [(고객, 상품명 칸)])
+# contiguous 결과는 기존 순차 비교(forward scan) 구현의 출력과 같아야 함
+MERGE_CASES = [
+    # 같은 고객 행 사이의 예외 상품 - 예외 행은 제자리에 수량만큼, 앞뒤 일반 상품은 한 행으로 병합
+    ([("A", "OPP", 2, False), ("A", "HD 37호 1000장", 2, True), ("A", "OPP", 1, False), ("B", "OPP", 1, False)],
+     {}, "contiguous",
+     [("A", "OPP 3장"), ("A", "HD 37호 1000장"), ("A", "HD 37호 1000장"), ("B", "OPP")]),
+    # 장수 제한으로 거절된 행은 두 번째 그룹을 시작하고, 이후 행은 첫 그룹부터 다시 병합 시도
+    ([("A", "HD 600장", 1, False), ("A", "OPP", 1, False), ("A", "HD 500장", 1, False),
+      ("A", "HD 300장", 1, False), ("A", "HD 500장", 1, False)],
+     {"HD": 1000}, "contiguous",
+     [("A", "HD 900장 ,OPP"), ("A", "HD 1000장")]),
+    # 같은 상품의 N장/장수 없는 행 병합
+    ([("A", "HD 100장", 2, False), ("A", "HD", 1, False), ("A", "HD 50장", 1, False),
+      ("A", "OPP", 1, False), ("A", "OPP 200장", 1, False), ("A", "PE", 2, False), ("A", "PE", 3, False)],
+     {}, "contiguous",
+     [("A", "HD 350장 ,OPP 400장 ,PE 5장")]),
+    # 떨어져 있는 같은 고객 - contiguous는 따로, global은 첫 위치에 병합
+    ([("A", "OPP", 1, False), ("B", "HD", 1, False), ("A", "OPP", 2, False), ("B", "HD 100장", 1, False)],
+     {}, "contiguous",
+     [("A", "OPP"), ("B", "HD"), ("A", "OPP 2장"), ("B", "HD 100장")]),
+    ([("A", "OPP", 1, False), ("B", "HD", 1, False), ("A", "OPP", 2, False), ("B", "HD 100장", 1, False)],
+     {}, "global",
+     [("A", "OPP 3장"), ("B", "HD 200장")]),
+    ([("A", "HD 600장", 1, False), ("B", "OPP", 1, False), ("A", "HD 600장", 1, False), ("A", "HD 300장", 1, False)],
+     {"HD": 1000}, "global",
+     [("A", "HD 900장"), ("B", "OPP"), ("A", "HD 600장")]),
+]
+
+
+@pytest.mark.parametrize("lines, sheet_limits, merge_mode, expected", MERGE_CASES)
+def test_merge_cases(lines, sheet_limits, merge_mode, expected):
+    rows = [make_row(product, quantity, customer(name), is_exception=is_exception)
+            for name, product, quantity, is_exception in lines]
+    output = list(iter_merged_rows(rows, sheet_limits, merge_mode))
+    assert output == [list(customer(name)) + [products, "1"] for name, products in expected]
+
+
+def output_sheets(product_cell):
+    """출력 행 상품명 칸의 상품별 장수 목록"""
+    sheets = []
+    for product in product_cell.split(" ,"):
+        parsed = parse_product_name(product)
+        sheets.append(parsed.sheet_count if parsed.has_sheets else 1)
+    return sheets
+
+
+def pack(rows, limit):
+    output = list(iter_merged_rows(rows, {rows[0].base_product: limit}, pack_sheets=True))
+    return [product for row in output for product in row[5].split(" ,")], output
+
+
+def default_sheets(rows):
+    """장수 한계 없이 기본 병합한 결과의 장수"""
+    return sum(s for row in iter_merged_rows(rows, {}) for s in output_sheets(row[5]))
+
+
+def test_pack_keeps_default_merge_within_limit():
+    # 병합한 장수가 한계 이하이면 묶음 나누기를 사용하지 않을 때와 같은 상품명으로 출력
+    rows = [make_row("HD 100장", 1), make_row("HD", 1), make_row("HD", 1)]
+    products, output = pack(rows, 1000)
+    assert products == ["HD 400장"]
+    assert output == list(iter_merged_rows(rows, {"HD": 1000}))
+
+
+@pytest.mark.parametrize("products, quantities, expected", [
+    # 장수 형식이 아닌 행은 기본 병합과 같이 병합될 상품의 장수로 계산 (기본 병합 1200장)
+    (["HD 300장", "HD", "HD"], [1, 1, 1], ["HD 900장", "HD 300장"]),
+    # 기본 병합 1400장
+    (["HD 300장", "HD", "HD 800장"], [1, 1, 1], ["HD 800장", "HD 600장"]),
+    # 행이 하나여도 한계를 넘으면 나눔
+    (["HD 300장"], [7], ["HD 900장", "HD 900장", "HD 300장"]),
+])
+def test_pack_splits_over_limit(products, quantities, expected):
+    rows = [make_row(product, quantity) for product, quantity in zip(products, quantities)]
+    packed, output = pack(rows, 1000)
+    assert packed == expected
+    assert sum(s for product in packed for s in output_sheets(product)) == default_sheets(rows)
+
+
+def test_pack_splits_by_limit():
+    rows = [make_row("HD 300장", 2), make_row("HD 500장", 1), make_row("HD 200장", 3)]
+    products, output = pack(rows, 1000)
+    sheets = [s for row in output for s in output_sheets(row[5])]
+    assert sum(sheets) == 1700
+    assert max(sheets) <= 1000
+
+
+def test_pack_large_quantities_are_bounded():
+    # 1개만으로 한계를 넘는 상품은 1개씩 나누지 않고 수량을 합친 묶음 하나
+    rows = [make_row("HD 2000장", 200000), make_row("HD 2000장", 200000)]
+    assert pack_sheet_lines(rows, 1000) == [["HD 2000장", 400000, 2000]]
+    assert len(pack(rows, 1000)[1]) == 1
+
+    # 한 묶음을 채우는 같은 크기의 항목은 개수만큼 한 번에 묶음을 만듦
+    slots = pack_sheet_lines([make_row("HD 300장", 30001), make_row("HD 50장", 1)], 1000)
+    assert len(slots) == 10001
+    assert slots[:2] == [["HD 300장", 3, 300], ["HD 300장", 3, 300]]
+    assert slots[-2:] == [["HD 300장", 1, 300], ["HD 950장", 1, 950]]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_pack_conserves_sheets_within_limit(seed):
+    rnd = random.Random(seed)
+    limit = rnd.choice([100, 500, 1000])
+    products = ["HD", "HD 50장", "HD 100장", "HD 300장", "HD 1000장"]
+    rows = [make_row(rnd.choice(products), rnd.randint(1, 5)) for _ in range(rnd.randint(1, 40))]
+
+    slots = pack_sheet_lines(rows, limit)
+    slot_sheets = [sheet_count * quantity if sheet_count > 0 else quantity for _, quantity, sheet_count in slots]
+    total_sheets = default_sheets(rows)
+    assert sum(slot_sheets) == total_sheets
+    # 1개만으로 한계를 넘는 상품(HD 1000장, 한계 100/500)만 한계를 넘는 단독 묶음
+    assert all(sheets <= limit or sheet_count > limit
+               for sheets, (_, _, sheet_count) in zip(slot_sheets, slots))
+
+    _, output = pack(rows, limit)
+    if total_sheets <= limit:
+        assert output == list(iter_merged_rows(rows, {"HD": limit}))
+    sheets = [s for row in output for s in output_sheets(row[5])]
+    assert sum(sheets) == total_sheets
+    assert len(output) == len(slots)
+
+
+def test_transform_dataframe_numeric_values():
+    pd = pytest.importorskip("pandas")
+    customer = ["홍길동", "010-0000-0000"]
+    numeric = pd.DataFrame([
+        [1001.0, "결제완료", "HD", "HD 100장", 2.0] + customer + [12345.0, "서울시 중구 1", None],
+        [1002.0, "결제완료", "OPP", "OPP", 3.0] + customer + [12345.0, "서울시 중구 1", None],
+    ], columns=REQUIRED_COLUMNS)
+    text = pd.DataFrame([
+        ["1001", "결제완료", "HD", "HD 100장", "2"] + customer + ["12345", "서울시 중구 1", None],
+        ["1002", "결제완료", "OPP", "OPP", "3"] + customer + ["12345", "서울시 중구 1", None],
+    ], columns=REQUIRED_COLUMNS)
+
+    transformer = Transformer(rules=RuleSet())
+    result = transformer.transform_dataframe(numeric)
+    assert result.success
+    assert result.rows == transformer.transform_dataframe(text).rows
+    assert result.rows == [customer + ["12345", "서울시 중구 1", "", "HD 200장 ,OPP 3장", "1"]]
+
+
+def test_checkpoint_claims_orders_across_processes(tmp_path):
+    checkpoint_file = str(tmp_path / "checkpoint.db")
+    rows = [make_row("HD 100장", 1, order_num=str(1000 + idx)) for idx in range(5)]
+
+    # 같은 누적 주문 파일을 두 실행이 동시에 변환 - 먼저 고른 실행만 주문을 가져감
+    with OrderCheckpoint(checkpoint_file) as first, OrderCheckpoint(checkpoint_file) as second:
+        assert first.select_new_rows(rows) == rows
+        assert second.select_new_rows(rows) == []
+        first.commit("first.xlsx")
+        assert second.select_new_rows(rows + [make_row("OPP", 1, order_num="2000")])[0].order_num == "2000"
+
+    # 저장하지 못하고 닫은 실행의 주문은 다음 실행에서 다시 변환
+    with OrderCheckpoint(checkpoint_file) as failed:
+        assert failed.select_new_rows(rows + [make_row("OPP", 1, order_num="3000")])[0].order_num == "3000"
+    with OrderCheckpoint(checkpoint_file) as retry:
+        assert [row.order_num for row in retry.select_new_rows(rows)] == []
+        assert [row.order_num for row in retry.select_new_rows([make_row("OPP", 1, order_num="3000")])] == ["3000"]
+
+
+def test_checkpoint_keeps_earlier_deltas(tmp_path):
+    pytest.importorskip("pandas")
+    openpyxl = pytest.importorskip("openpyxl")
+
+    def write_export(order_count):
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(REQUIRED_COLUMNS)
+        for idx in range(order_count):
+            sheet.append([str(1000 + idx), "결제완료", "HD", "HD 100장", "1", f"고객{idx}", "010-0000-0000",
+                          "12345", "서울시 중구 1", ""])
+        workbook.save(input_file)
+
+    input_file = str(tmp_path / "input.xlsx")
+    output_file = str(tmp_path / "output.xlsx")
+    checkpoint_file = str(tmp_path / "checkpoint.db")
+    options = dict(rules=RuleSet(), checkpoint_file=checkpoint_file)
+
+    write_export(2)
+    assert transform_excel_file(input_file, output_file, **options) is True
+    first_delta = (tmp_path / "output.xlsx").read_bytes()
+
+    # 새 주문이 없으면 아무 파일도 건드리지 않음
+    assert transform_excel_file(input_file, output_file, **options) is None
+    assert sorted(path.name for path in tmp_path.glob("output*.xlsx")) == ["output.xlsx"]
+
+    # 새 주문은 이전 결과를 덮어쓰지 않고 새 파일에 기록
+    write_export(3)
+    assert transform_excel_file(input_file, output_file, **options) is True
+    assert (tmp_path / "output.xlsx").read_bytes() == first_delta
+    assert len(list(tmp_path.glob("output*.xlsx"))) == 2
+
+
+def test_sheet_limit_rejections_counted_once_per_row():
+    counters = collections.Counter()
+    output = list(iter_merged_rows([make_row("HD 300장", 1) for _ in range(7)], {"HD": 1000}, counters=counters))
+    assert len(output) == 3
+    assert counters['sheet_limit_rejections'] == 2
+
+
+OUTPUT_ROWS = [
+    ["홍길동", "01099998888", "01234", "서울시 중구 1", "문 앞, \"부재 시\" 경비실", "HD 200장 ,OPP 3장", "1"],
+    ["김철수", "010-1234-5678", "12345", "부산시 2", "", "OPP", "1"],
+]
+
+
+def test_csv_writer_quotes_text_with_bom(tmp_path):
+    path = tmp_path / "output.csv"
+    writer = create_output_writer(str(path))
+    writer.write_rows(OUTPUT_ROWS)
+    assert writer.close(len(OUTPUT_ROWS))
+
+    content = path.read_bytes()
+    assert content.startswith(b"\xef\xbb\xbf")
+    assert content.decode("utf-8-sig").splitlines()[0].startswith('"홍길동","01099998888","01234",')
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        assert list(csv.reader(f)) == OUTPUT_ROWS
+
+
+def test_tsv_writer_and_in_memory_output():
+    buffer = io.BytesIO()
+    writer = create_output_writer(buffer, "tsv")
+    writer.write_rows(OUTPUT_ROWS)
+    assert writer.close(len(OUTPUT_ROWS))
+    assert not buffer.closed
+    rows = list(csv.reader(io.StringIO(buffer.getvalue().decode("utf-8-sig")), delimiter="\t"))
+    assert rows == OUTPUT_ROWS
+
+
+def test_parquet_writer_schema(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    for target in (str(tmp_path / "output.parquet"), io.BytesIO()):
+        writer = create_output_writer(target, "parquet")
+        writer.write_rows(OUTPUT_ROWS)
+        assert writer.close(len(OUTPUT_ROWS))
+        # 메모리 출력은 Transformer와 같이 닫은 뒤의 내용(bytes)을 읽음
+        table = pq.read_table(target if isinstance(target, str) else io.BytesIO(target.getvalue()))
+        assert table.column_names == OUTPUT_COLUMNS
+        assert all(str(field.type) == "string" for field in table.schema)
+        assert table.to_pylist()[0]["받는분 연락처"] == "01099998888"
+
+
+def test_several_formats_from_one_merge(tmp_path):
+    paths = [str(tmp_path / "output.csv"), str(tmp_path / "output.tsv")]
+    merged_rows = iter(OUTPUT_ROWS)  # 한 번만 읽을 수 있는 병합 결과
+    with _open_output_writers(paths) as writers:
+        assert _write_merged_rows(writers, merged_rows, ConversionProfile()) == len(OUTPUT_ROWS)
+        assert all(writer.close(len(OUTPUT_ROWS)) for writer in writers)
+    for path, delimiter in zip(paths, (",", "\t")):
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            assert list(csv.reader(f, delimiter=delimiter)) == OUTPUT_ROWS
+
+
+def test_writers_discard_files_after_failure(tmp_path):
+    paths = [str(tmp_path / "output.csv"), str(tmp_path / "output.tsv")]
+    with pytest.raises(RuntimeError):
+        with _open_output_writers(paths) as writers:
+            _write_merged_rows(writers, OUTPUT_ROWS, ConversionProfile())
+            raise RuntimeError("기록 중 오류")
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_output_format_must_match_extension():
+    assert resolve_output_format("output.txt") == "tsv"
+    assert resolve_output_format(io.BytesIO(), "csv") == "csv"
+    with pytest.raises(ValueError):
+        resolve_output_format("output.xlsx", "csv")
+    assert parse_args(["--format", "csv"]).output == ["output.csv"]
+    assert parse_args([]).output == ["output.xlsx"]
+
+
+def fake_channel_exports(monkeypatch, exports):
+    """입력 파일 이름별 주문 행으로 read_order_rows를 대체 (없는 이름은 읽기 오류)"""
+    def read_order_rows(input_file, exception_products=(), engine=None):
+        name = os.path.basename(input_file)
+        if name not in exports:
+            raise ValueError(f"읽을 수 없는 파일: {name}")
+        return [make_row(product, quantity, customer(who)) for who, product, quantity in exports[name]]
+    monkeypatch.setattr(excel_trans, "read_order_rows", read_order_rows)
+
+
+def test_fan_in_merges_customer_across_inputs(tmp_path, monkeypatch):
+    fake_channel_exports(monkeypatch, {
+        "smartstore.xlsx": [("A", "HD 100장", 1), ("B", "OPP", 1)],
+        "coupang.xlsx": [("C", "OPP", 1), ("A", "HD 200장", 1), ("A", "OPP", 2)],
+    })
+    input_files = [str(tmp_path / "smartstore.xlsx"), str(tmp_path / "coupang.xlsx")]
+    for path in input_files:
+        open(path, "wb").close()
+    output_file = str(tmp_path / "output.csv")
+
+    assert transform_excel_files(input_files, output_file, rules=RuleSet(), workers=1)
+    with open(output_file, encoding="utf-8-sig", newline="") as f:
+        rows = list(csv.reader(f))
+    assert rows == [list(customer("A")) + ["HD 300장 ,OPP 2장", "1"],
+                    list(customer("B")) + ["OPP", "1"],
+                    list(customer("C")) + ["OPP", "1"]]
+
+
+def test_fan_in_fails_when_one_input_is_unreadable(tmp_path, monkeypatch):
+    fake_channel_exports(monkeypatch, {"smartstore.xlsx": [("A", "OPP", 1)]})
+    input_files = [str(tmp_path / "smartstore.xlsx"), str(tmp_path / "broken.xlsx")]
+    for path in input_files:
+        open(path, "wb").close()
+
+    assert excel_trans._read_input_rows(input_files, frozenset(), "pandas", 1) is None
+    assert not transform_excel_files(input_files, str(tmp_path / "output.csv"), rules=RuleSet(), workers=1)
+    assert not (tmp_path / "output.csv").exists()
+
+
+def test_load_rule_set_logs_missing_or_invalid_file_once(tmp_path, caplog):
+    exception_file = str(tmp_path / "exceptions.json")
+    caplog.set_level(logging.INFO, logger="excel_trans")
+
+    # 폴더 감시는 확인할 때마다 규칙을 다시 요청
+    for _ in range(5):
+        assert len(load_rule_set(exception_file)) == 0
+    assert sum("존재하지 않습니다" in record.getMessage() for record in caplog.records) == 1
+
+    caplog.clear()
+    with open(exception_file, "w", encoding="utf-8") as f:
+        f.write("{")
+    for _ in range(5):
+        assert len(load_rule_set(exception_file)) == 0
+    assert sum(record.levelno == logging.ERROR for record in caplog.records) == 1
+
+    with open(exception_file, "w", encoding="utf-8") as f:
+        f.write('{"exception_products": ["HD 1000장"]}')
+    assert load_rule_set(exception_file).sheet_limits == {"HD": 1000}
+
+
+def test_streaming_and_openpyxl_engine_match_pandas(tmp_path):
+    pytest.importorskip("pandas")
+    openpyxl = pytest.importorskip("openpyxl")
+
+    input_file = str(tmp_path / "input.xlsx")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(REQUIRED_COLUMNS)
+    orders = [
+        ("A", "HD 100장", 2), ("A", "HD", 1), ("A", "HD 37호 1000장", 2), ("A", "OPP", 1),
+        ("B", "HD 600장", 1), ("B", "HD 600장", 1), ("A", "OPP 200장", 3),
+    ]
+    for idx, (name, product, quantity) in enumerate(orders):
+        sheet.append([1000 + idx, "결제완료", product, product, quantity, name, "01099998888", "01234",
+                      "서울시 중구 1", None])
+    workbook.create_sheet("메모").append(["그대로 복사", 1])
+    workbook.save(input_file)
+
+    rules = RuleSet(["HD 37호 1000장", "HD 1000장"])
+    outputs = {}
+    for name, options in (("pandas", {}), ("streaming", {'streaming': True}), ("openpyxl", {'engine': "openpyxl"})):
+        output_file = str(tmp_path / f"{name}.xlsx")
+        assert transform_excel_file(input_file, output_file, rules=rules, **options)
+        output = openpyxl.load_workbook(output_file)
+        outputs[name] = (
+            {ws.title: [list(row) for row in ws.iter_rows(values_only=True)] for ws in output.worksheets},
+            [cell.number_format for (cell,) in output.worksheets[0].iter_rows(min_col=2, max_col=2)],
+        )
+
+    assert outputs["streaming"] == outputs["pandas"]
+    assert outputs["openpyxl"] == outputs["pandas"]
+    sheets, phone_formats = outputs["pandas"]
+    assert sheets["메모"] == [["그대로 복사", 1]]
+    assert set(phone_formats) == {"@"}
+    assert all(row[1] == "01099998888" for row in list(sheets.values())[0])
@@ -0,0 +1,4 @@
+@echo off
+python excel_trans.py --watch inbox --outbox outbox
+echo.
+pause
\ No newline at end of file
@@ -0,0 +1,4 @@
+@echo off
+python excel_trans.py --batch input --output-dir output
+echo.
+pause
\ No newline at end of file